@@ -4,12 +4,35 @@ Admin command handlers for No Mercy Zone Bot
 
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
-from database import *
-from messages import get_admin_dashboard_message, get_tournament_post
-from utils import *
-from config import ADMIN_ID, ENTRY_FEES, PRIZE_POOLS, TOURNAMENT_MAPS
+from database import (
+    PAYMENT_EXPORT_FIELDS, PLAYER_EXPORT_FIELDS,
+    ban_user, confirm_payment, confirm_payments, create_tournament, decline_payment,
+    delete_tournament, enqueue_outbox, flush_events, get_active_tournaments, get_archived_revenue,
+    get_dashboard_snapshot, get_financial_data, get_kill_samples, get_pending_payment_index, get_tournament,
+    get_tournament_participants, get_user_timeline, has_match_results, iter_payments,
+    iter_tournament_players, record_match_results, remove_participant,
+    resolve_username, unban_user, update_tournament, update_user
+)
+from messages import (
+    format_timeline_event, get_admin_dashboard_message, get_ai_suggestion_message, get_tournament_post
+)
+from utils import (
+    chunk_lines, get_ai_tournament_suggestion, get_ist_time,
+    get_next_tournament_time, get_tournament_status_emoji
+)
+from config import ADMIN_ID, CHANNEL_ID, ENTRY_FEES, PRIZE_POOLS, TOURNAMENT_MAPS
+from outbox import notify_outbox
+from channel_posts import build_channel_post, mark_post_dirty
+from waitlist import NOTIFY_DELAY, release_slots
+from results import ResultError, parse_result_table, match_roster, compute_payouts
+from leaderboard import apply_results
+from export import write_export
+from reconcile import match_statement
+from broadcast import start_broadcast
+import asyncio
 import random
-from datetime import datetime, timedelta
+import tempfile
+from datetime import datetime, timedelta, timezone
 
 async def admin_dashboard_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /dashboard command for admin"""
@@ -19,8 +42,15 @@ async def admin_dashboard_command(update: Update, context: ContextTypes.DEFAULT_
         await update.message.reply_text("❌ Admin only command!")
         return
     
-    dashboard_msg = get_admin_dashboard_message()
+    dashboard_msg = get_admin_dashboard_message(get_dashboard_snapshot())
     await update.message.reply_text(dashboard_msg)
+    
+    # Suggestions are memoised per hour, so only the first view each hour touches the database
+    picks = []
+    for tournament_type in ('solo', 'duo', 'squad'):
+        suggestion = await asyncio.to_thread(get_ai_tournament_suggestion, tournament_type)
+        picks.append(get_ai_suggestion_message(tournament_type, suggestion))
+    await update.message.reply_text("\n\n".join(picks) + "\n\n`/approve_ai <type>` se create karo", parse_mode='Markdown')
 
 async def is_admin(user_id):
     """Check if user is admin"""
@@ -88,8 +118,9 @@ async def create_tournament_interactive(update, context, tournament_type):
         'prize_info': get_prize_info(tournament_type, 'rank_based')
     }
     
-    # Create tournament in database
-    created_tournament = create_tournament(tournament_data)
+    # Create tournament in database, queueing the channel post with it
+    created_tournament = create_tournament(tournament_data, announcement=tournament_announcement)
+    notify_outbox()
     
     # Generate tournament post
     tournament_post = get_tournament_post(created_tournament)
@@ -105,31 +136,15 @@ Tournament ID: `{created_tournament['tournament_id']}`
 
 🎯 Tournament ready for participants!
 ⏰ Room details will be available 10 minutes before match starts.
-Room details: Use /droproom command."""
+Room details: Use /droproom command.
+
+📢 Channel post queued, it will be delivered automatically."""
     
     await update.message.reply_text(msg, parse_mode='Markdown')
-    
-    # Auto-post to channel
-    from config import CHANNEL_ID
-    from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-    try:
-        channel_msg = f"""{tournament_post}
 
-⏰ Room ID & Password will be shared 10 minutes before match starts!"""
-        
-        # Add join button
-        keyboard = [[InlineKeyboardButton("🎮 JOIN TOURNAMENT", callback_data=f"join_tournament_{created_tournament['tournament_id']}")]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        await context.bot.send_message(
-            chat_id=CHANNEL_ID,
-            text=channel_msg,
-            reply_markup=reply_markup,
-            parse_mode='Markdown'
-        )
-        await update.message.reply_text("✅ Tournament posted to channel automatically!")
-    except Exception as e:
-        await update.message.reply_text(f"✅ Tournament created! ❌ Auto-post failed: {str(e)}")
+def tournament_announcement(tournament):
+    """Channel post with join button, queued in the outbox together with the tournament"""
+    return {"chat_id": CHANNEL_ID, **build_channel_post(tournament)}
 
 async def handle_tournament_creation_steps(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle step-by-step tournament creation"""
@@ -221,8 +236,9 @@ Reply with: 1, 2, or 3"""
                 'prize_info': get_prize_info(creation_data['type'], creation_data['prize_type'])
             }
             
-            # Create in database
-            created_tournament = create_tournament(tournament_data)
+            # Create in database, queueing the channel post with it
+            created_tournament = create_tournament(tournament_data, announcement=tournament_announcement)
+            notify_outbox()
             
             # Schedule room notification
             schedule_room_notification(created_tournament)
@@ -237,32 +253,12 @@ Reply with: 1, 2, or 3"""
 Tournament ID: `{created_tournament['tournament_id']}`
 
 🎯 Tournament ready for participants!
-⏰ Room details will be available 10 minutes before match starts."""
+⏰ Room details will be available 10 minutes before match starts.
+
+📢 Channel post queued, it will be delivered automatically."""
             
             await update.message.reply_text(msg, parse_mode='Markdown')
             
-            # Auto-post to channel
-            from config import CHANNEL_ID
-            from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-            try:
-                channel_msg = f"""{tournament_post}
-
-⏰ Room ID & Password will be shared 10 minutes before match starts!"""
-                
-                # Add join button
-                keyboard = [[InlineKeyboardButton("🎮 JOIN TOURNAMENT", callback_data=f"join_tournament_{created_tournament['tournament_id']}")]]
-                reply_markup = InlineKeyboardMarkup(keyboard)
-                
-                await context.bot.send_message(
-                    chat_id=CHANNEL_ID,
-                    text=channel_msg,
-                    reply_markup=reply_markup,
-                    parse_mode='Markdown'
-                )
-                await update.message.reply_text("✅ Tournament posted to channel automatically!")
-            except Exception as e:
-                await update.message.reply_text(f"✅ Tournament created! ❌ Auto-post failed: {str(e)}")
-            
             # Clear creation data
             del context.user_data['creating_tournament']
         else:
@@ -362,6 +358,23 @@ AI analysis ke saath smart suggestions! 🧠"""
     market_trends = analyze_market_trends()
     optimal_timing = get_optimal_tournament_timing()
     
+    # Fee x entries x prize type grid with Monte Carlo kill draws from past results on this map
+    from simulator import simulate_fee_grid, break_even_players
+    kill_samples = await asyncio.to_thread(get_kill_samples, tournament_type, suggestion['map'])
+    simulation = await asyncio.to_thread(
+        simulate_fee_grid, tournament_type, suggestion['map'], kill_samples,
+        expected_participants=estimated_participants
+    )
+    best = simulation['optimal']
+    break_even = break_even_players(simulation, entry_fee, suggestion['prize_type'])
+    if best:
+        simulation_msg = f"""• Best Fee: ₹{best['fee']} ({best['participants']} entries, {best['prize_type']})
+• Expected Profit: ₹{best['expected_profit']:,}
+• 95% Payout Risk: ₹{best['p95_payout']:,}
+• Loss Chance: {best['loss_probability'] * 100:.1f}%"""
+    else:
+        simulation_msg = "• No fee stays under the loss-risk limit"
+    
     msg = f"""🤖 *AI TOURNAMENT RECOMMENDATION*
 
 🎯 *TOURNAMENT DETAILS:*
@@ -383,6 +396,10 @@ AI analysis ke saath smart suggestions! 🧠"""
 • ROI: {profit_analysis['adjusted_roi']}%
 • Risk Level: {profit_analysis['risk_level']}
 
+📐 *FEE SIMULATION ({simulation['draws']:,} runs):*
+{simulation_msg}
+• Break-even @ ₹{entry_fee}: {break_even or 'never'} players
+
 📊 *MARKET INSIGHTS:*
 • Player Activity: {market_trends['player_activity']}%
 • Competition Level: {market_trends['competition_level']}
@@ -412,12 +429,12 @@ async def active_tournaments_command(update: Update, context: ContextTypes.DEFAU
     msg = "🎮 *ACTIVE TOURNAMENTS*\n\n"
     
     for tournament in tournaments:
-        participants_count = len(tournament.get('participants', []))
+        participants_count = tournament.get('participant_count', 0)
         status_emoji = get_tournament_status_emoji(tournament['status'])
         
         msg += f"{status_emoji} *{tournament['name']}*\n"
         msg += f"📅 {tournament['date']} at {tournament['time']}\n"
-        msg += f"👥 Participants: {participants_count}\n"
+        msg += f"👥 Participants: {participants_count}/{tournament.get('max_slots', '∞')}\n"
         msg += f"💰 Entry Fee: ₹{tournament['entry_fee']}\n"
         msg += f"🆔 ID: `{tournament['tournament_id']}`\n\n"
     
@@ -457,6 +474,9 @@ async def drop_room_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("❌ Tournament not found!")
         return
     
+    # Channel post switches to LIVE and drops the join button
+    mark_post_dirty(tournament_id)
+    
     # Get tournament participants
     participants = get_tournament_participants(tournament_id)
     
@@ -474,20 +494,13 @@ Good luck warriors! 🔥"""
     # Send to admin first
     await update.message.reply_text(room_msg, parse_mode='Markdown')
     
-    # Send to all participants
-    success_count = 0
-    for participant in participants:
-        try:
-            await context.bot.send_message(
-                chat_id=participant['user_id'],
-                text=room_msg,
-                parse_mode='Markdown'
-            )
-            success_count += 1
-        except:
-            continue
+    # Send to all participants; progress is recorded so a restart resumes the broadcast
+    await start_broadcast(
+        context.bot, room_msg, [p['user_id'] for p in participants],
+        parse_mode='Markdown', label="Room details", report_chat_id=update.effective_chat.id
+    )
     
-    await update.message.reply_text(f"✅ Room details sent to {success_count}/{len(participants)} participants")
+    await update.message.reply_text(f"📤 Sending room details to {len(participants)} participants...")
 
 async def list_players_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /listplayers command"""
@@ -508,18 +521,21 @@ async def list_players_command(update: Update, context: ContextTypes.DEFAULT_TYP
         await update.message.reply_text("❌ No participants found for this tournament!")
         return
     
-    msg = f"👥 *PARTICIPANTS LIST*\n\nTournament: {tournament_id}\n\n"
+    header = f"👥 PARTICIPANTS LIST\n\nTournament: {tournament_id}\n\n"
+    lines = []
     
     for i, participant in enumerate(participants, 1):
-        username = participant.get('username', 'No username')
-        first_name = participant.get('first_name', 'Unknown')
-        paid_status = "✅" if participant.get('confirmed', False) else "❌"
+        username = participant.get('username') or 'No username'
+        first_name = participant.get('first_name') or 'Unknown'
+        paid_status = "✅" if participant.get('paid', False) else "❌"
         
-        msg += f"{i}. {first_name} (@{username}) {paid_status}\n"
+        lines.append(f"{i}. {first_name} (@{username}) {paid_status}")
     
-    msg += f"\nTotal: {len(participants)} participants"
+    lines.append(f"\nTotal: {len(participants)} participants")
     
-    await update.message.reply_text(msg, parse_mode='Markdown')
+    # Usernames contain underscores, so the roster is sent as plain text
+    for chunk in chunk_lines(lines, header=header):
+        await update.message.reply_text(chunk)
 
 async def clear_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /clear command"""
@@ -545,9 +561,7 @@ async def clear_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             return
         
         tournament_id = context.args[1]
-        result = delete_tournament(tournament_id)
-        
-        if result.deleted_count > 0:
+        if delete_tournament(tournament_id, actor=user_id):
             await update.message.reply_text(f"✅ Tournament {tournament_id} deleted!")
         else:
             await update.message.reply_text("❌ Tournament not found!")
@@ -561,14 +575,13 @@ async def clear_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         user_id_to_remove = int(context.args[2])
         
         # Remove player from tournament
-        from database import db
-        result = db.tournaments.update_one(
-            {"tournament_id": tournament_id},
-            {"$pull": {"participants": user_id_to_remove}}
-        )
-        
-        if result.modified_count > 0:
+        if remove_participant(tournament_id, user_id_to_remove, actor=user_id):
             await update.message.reply_text(f"✅ Player {user_id_to_remove} removed from tournament!")
+            
+            # Freed slot goes to the oldest waitlisted player
+            promoted = await release_slots(context.bot, tournament_id)
+            if promoted:
+                await update.message.reply_text(f"🔁 Slot offered to {len(promoted)} waitlisted player(s)")
         else:
             await update.message.reply_text("❌ Player not found in tournament!")
 
@@ -584,6 +597,8 @@ async def data_vault_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
     today_data = get_financial_data("today")
     weekly_data = get_financial_data("weekly")
     monthly_data = get_financial_data("monthly")
+    live_data = get_financial_data("all")
+    archived_data = get_archived_revenue()
     
     msg = f"""💰 *FINANCIAL VAULT*
 
@@ -599,10 +614,61 @@ async def data_vault_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
 • Revenue: ₹{monthly_data['total_revenue']}
 • Transactions: {monthly_data['total_transactions']}
 
+🏦 *ALL-TIME:*
+• Revenue: ₹{live_data['total_revenue'] + archived_data['total_revenue']}
+• Transactions: {live_data['total_transactions'] + archived_data['total_transactions']}
+
 💎 Ghost Commander ka empire grow kar raha hai! 🔥"""
     
     await update.message.reply_text(msg, parse_mode='Markdown')
 
+async def export_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /export - send payments or players as a compressed file"""
+    user_id = update.effective_user.id
+    
+    if not await is_admin(user_id):
+        await update.message.reply_text("❌ Admin only command!")
+        return
+    
+    usage = (
+        "Usage:\n"
+        "/export payments <from YYYY-MM-DD> <to YYYY-MM-DD> [csv|json]\n"
+        "/export players <tournament_id> [csv|json]"
+    )
+    args = context.args or []
+    fmt = args.pop() if args and args[-1] in ("csv", "json") else "csv"
+    
+    if len(args) == 3 and args[0] == "payments":
+        try:
+            start = datetime.strptime(args[1], "%Y-%m-%d").replace(tzinfo=timezone.utc)
+            end = datetime.strptime(args[2], "%Y-%m-%d").replace(tzinfo=timezone.utc) + timedelta(days=1)
+        except ValueError:
+            await update.message.reply_text("❌ Invalid date format! Use YYYY-MM-DD")
+            return
+        rows = iter_payments(start, end)
+        fields = PAYMENT_EXPORT_FIELDS
+        filename = f"payments_{args[1]}_{args[2]}"
+    elif len(args) == 2 and args[0] == "players":
+        rows = iter_tournament_players(args[1])
+        fields = PLAYER_EXPORT_FIELDS
+        filename = f"players_{args[1]}"
+    else:
+        await update.message.reply_text(usage)
+        return
+    
+    await update.message.reply_text("⏳ Export ban raha hai...")
+    
+    # Cursor iteration and compression are blocking, keep them off the event loop
+    fileobj, count = await asyncio.to_thread(write_export, rows, fields, fmt)
+    
+    with fileobj:
+        await context.bot.send_document(
+            chat_id=update.effective_chat.id,
+            document=fileobj,
+            filename=f"{filename}.{'jsonl' if fmt == 'json' else 'csv'}.gz",
+            caption=f"📦 {count} rows exported"
+        )
+
 async def special_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /special command for winner declarations"""
     user_id = update.effective_user.id
@@ -655,21 +721,190 @@ Next tournament ke liye ready raho! 💪"""
         await update.message.reply_text("❌ Invalid special type!")
         return
     
-    # Send to admin first
+    # Queue for the channel; the outbox dispatcher retries until it is delivered
+    enqueue_outbox(chat_id=CHANNEL_ID, text=winner_msg, parse_mode='Markdown')
+    notify_outbox()
+    
+    # Send to admin
     await update.message.reply_text(winner_msg, parse_mode='Markdown')
+    await update.message.reply_text("✅ Message queued for the channel!")
+
+async def results_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /results - record kills/ranks, compute prizes and post the results"""
+    user_id = update.effective_user.id
     
-    # Auto-share to channel
-    from config import CHANNEL_ID
-    try:
-        await context.bot.send_message(
-            chat_id=CHANNEL_ID,
-            text=winner_msg,
-            parse_mode='Markdown'
+    if not await is_admin(user_id):
+        await update.message.reply_text("❌ Admin only command!")
+        return
+    
+    # Works as "/results <id>" followed by rows, or as the caption of a CSV upload
+    message = update.message
+    command_line, _, table = (message.text or message.caption or "").partition("\n")
+    args = command_line.split()[1:]
+    
+    if not args:
+        await message.reply_text(
+            "Usage: /results <tournament_id>\n"
+            "@username, kills, rank\n"
+            "123456789, kills, rank\n\n"
+            "Or upload a CSV with caption /results <tournament_id>"
         )
-        await update.message.reply_text("✅ Message posted to channel automatically!")
-    except Exception as e:
-        await update.message.reply_text(f"✅ Message ready! ❌ Auto-post to channel failed: {str(e)}")
-        await update.message.reply_text("📱 Please forward manually to channel/groups.")
+        return
+    
+    tournament_id = args[0]
+    tournament = get_tournament(tournament_id)
+    
+    if not tournament:
+        await message.reply_text("❌ Tournament not found!")
+        return
+    
+    if has_match_results(tournament_id):
+        await message.reply_text("❌ Results already recorded for this tournament!")
+        return
+    
+    if message.document:
+        file = await message.document.get_file()
+        table = (await file.download_as_bytearray()).decode("utf-8-sig")
+    
+    prize_type = tournament.get('prize_type', 'rank_based')
+    pools = PRIZE_POOLS[tournament['type']]
+    prizes = {**pools['kill_based'], **pools['rank_based']} if prize_type == 'hybrid' else pools.get(prize_type, {})
+    
+    try:
+        rows = match_roster(parse_result_table(table), get_tournament_participants(tournament_id))
+    except ResultError as e:
+        await message.reply_text(f"❌ {e}")
+        return
+    
+    results = compute_payouts(prize_type, prizes, rows)
+    if not record_match_results(tournament_id, [
+        {k: row[k] for k in ("user_id", "kills", "rank", "prize")} for row in results
+    ]):
+        await message.reply_text("❌ Results already recorded for this tournament!")
+        return
+    apply_results(tournament['type'], results)
+    update_tournament(tournament_id, {"status": "completed"})
+    mark_post_dirty(tournament_id)
+    
+    results.sort(key=lambda row: (row["rank"], -row["kills"]))
+    total_payout = sum(row["prize"] for row in results)
+    lines = [
+        f"#{row['rank']} {row['name']} - {row['kills']} kills - ₹{row['prize']}"
+        for row in results if row["prize"] > 0
+    ]
+    
+    header = f"""🏆 RESULTS: {tournament['name']}
+
+"""
+    for chunk in chunk_lines(lines + ["", "🚫 No Mercy Zone mein sirf legends jeetate hain! 🔥"], header=header):
+        enqueue_outbox(chat_id=CHANNEL_ID, text=chunk)
+    notify_outbox()
+    
+    await message.reply_text(
+        f"✅ Results recorded for {len(results)} players\n"
+        f"💰 Total payout: ₹{total_payout} to {len(lines)} winners\n"
+        f"📢 Results queued for the channel"
+    )
+
+async def reconcile_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /reconcile - confirm pending payments against an uploaded bank/UPI statement"""
+    user_id = update.effective_user.id
+    
+    if not await is_admin(user_id):
+        await update.message.reply_text("❌ Admin only command!")
+        return
+    
+    message = update.message
+    if not message.document:
+        await message.reply_text("Usage: upload the bank/UPI statement CSV with caption /reconcile")
+        return
+    
+    # Stream the statement from disk instead of holding it in memory
+    with tempfile.NamedTemporaryFile(suffix=".csv") as statement:
+        file = await message.document.get_file()
+        await file.download_to_drive(custom_path=statement.name)
+        
+        pending = await asyncio.to_thread(get_pending_payment_index)
+        pending_count = len(pending)
+        
+        def match():
+            with open(statement.name, newline="", encoding="utf-8-sig", errors="replace") as lines:
+                return match_statement(lines, pending)
+        
+        try:
+            matched, mismatched, rows = await asyncio.to_thread(match)
+        except ValueError as e:
+            await message.reply_text(f"❌ {e}")
+            return
+    
+    confirmed = await asyncio.to_thread(
+        confirm_payments, [(p["user_id"], p["tournament_id"]) for p in matched], user_id, "statement"
+    )
+    
+    for payment in confirmed:
+        try:
+            await context.bot.send_message(
+                chat_id=payment["user_id"],
+                text=f"✅ Payment confirmed for {payment['tournament_id']}! You're all set. 🔥"
+            )
+        except Exception:
+            pass
+        await asyncio.sleep(NOTIFY_DELAY)
+    
+    lines = [
+        f"⚠️ UTR {p['utr']}: paid ₹{amount if amount is not None else '?'}, expected ₹{p['amount']}"
+        for p, amount in mismatched
+    ]
+    header = f"""📑 RECONCILIATION DONE
+
+📄 Statement rows: {rows}
+✅ Confirmed: {len(confirmed)}
+⚠️ Amount mismatch: {len(mismatched)}
+⏳ Still pending (not in statement): {len(pending)} of {pending_count}
+
+"""
+    for chunk in chunk_lines(lines, header=header):
+        await message.reply_text(chunk)
+
+async def timeline_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /timeline - show a user's payment, ban and tournament history"""
+    user_id = update.effective_user.id
+    
+    if not await is_admin(user_id):
+        await update.message.reply_text("❌ Admin only command!")
+        return
+    
+    if not context.args:
+        await update.message.reply_text("Usage: /timeline <user_id> or /timeline @username")
+        return
+    
+    target = context.args[0]
+    
+    if target.startswith('@'):
+        target_user_id = resolve_username(target)
+    elif target.isdigit():
+        target_user_id = int(target)
+    else:
+        await update.message.reply_text("❌ Invalid user ID!")
+        return
+    
+    if target_user_id is None:
+        await update.message.reply_text("❌ User not found!")
+        return
+    
+    # Include anything still sitting in the write buffer
+    await asyncio.to_thread(flush_events)
+    events = await asyncio.to_thread(get_user_timeline, target_user_id)
+    
+    if not events:
+        await update.message.reply_text(f"📭 No recorded events for {target}")
+        return
+    
+    header = f"""🕵️ TIMELINE: {target}
+
+"""
+    for chunk in chunk_lines([format_timeline_event(event) for event in events], header=header):
+        await update.message.reply_text(chunk)
 
 async def ban_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /ban command"""
@@ -688,13 +923,10 @@ async def ban_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # Extract user ID
     if target.startswith('@'):
         # Find user by username
-        username = target[1:]
-        from database import db
-        user_doc = db.users.find_one({"username": username})
-        if not user_doc:
+        target_user_id = resolve_username(target)
+        if target_user_id is None:
             await update.message.reply_text("❌ User not found!")
             return
-        target_user_id = user_doc['user_id']
     else:
         try:
             target_user_id = int(target)
@@ -703,7 +935,7 @@ async def ban_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             return
     
     # Ban user
-    result = ban_user(target_user_id)
+    result = ban_user(target_user_id, actor=user_id)
     
     if result.modified_count > 0:
         await update.message.reply_text(f"✅ User {target} banned successfully! 🔨")
@@ -726,13 +958,10 @@ async def unban_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     # Extract user ID
     if target.startswith('@'):
-        username = target[1:]
-        from database import db
-        user_doc = db.users.find_one({"username": username})
-        if not user_doc:
+        target_user_id = resolve_username(target)
+        if target_user_id is None:
             await update.message.reply_text("❌ User not found!")
             return
-        target_user_id = user_doc['user_id']
     else:
         try:
             target_user_id = int(target)
@@ -741,7 +970,7 @@ async def unban_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             return
     
     # Unban user
-    result = unban_user(target_user_id)
+    result = unban_user(target_user_id, actor=user_id)
     
     if result.modified_count > 0:
         await update.message.reply_text(f"✅ User {target} unbanned successfully! ✨")
@@ -757,36 +986,41 @@ async def confirm_payment_command(update: Update, context: ContextTypes.DEFAULT_
         return
     
     if not context.args:
-        await update.message.reply_text("Usage: /confirm @username")
+        await update.message.reply_text("Usage: /confirm @username [tournament_id]")
         return
     
     target = context.args[0]
     
-    if not target.startswith('@'):
+    if target.startswith('@'):
+        target_user_id = resolve_username(target)
+    elif target.isdigit():
+        target_user_id = int(target)
+    else:
         await update.message.reply_text("❌ Use @username format!")
         return
     
-    username = target[1:]
-    from database import db
-    user_doc = db.users.find_one({"username": username})
-    
-    if not user_doc:
+    if target_user_id is None:
         await update.message.reply_text("❌ User not found!")
         return
     
+    # With a tournament ID the payment record itself is confirmed (and counted in total_spent)
+    if len(context.args) > 1 and not confirm_payment(target_user_id, context.args[1], actor=user_id):
+        await update.message.reply_text("❌ No unconfirmed payment found for that tournament!")
+        return
+    
     # Update user as confirmed
-    update_user(user_doc['user_id'], {"paid": True, "confirmed": True})
+    update_user(target_user_id, {"paid": True, "confirmed": True})
     
     # Notify user
     try:
         await context.bot.send_message(
-            chat_id=user_doc['user_id'],
+            chat_id=target_user_id,
             text="✅ Payment confirmed! You can now join tournaments. 🔥"
         )
     except:
         pass
     
-    await update.message.reply_text(f"✅ Payment confirmed for @{username}!")
+    await update.message.reply_text(f"✅ Payment confirmed for {target}!")
 
 async def decline_payment_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /decline command"""
@@ -797,33 +1031,42 @@ async def decline_payment_command(update: Update, context: ContextTypes.DEFAULT_
         return
     
     if not context.args:
-        await update.message.reply_text("Usage: /decline @username")
+        await update.message.reply_text("Usage: /decline @username [tournament_id]")
         return
     
     target = context.args[0]
     
-    if not target.startswith('@'):
+    if target.startswith('@'):
+        target_user_id = resolve_username(target)
+    elif target.isdigit():
+        target_user_id = int(target)
+    else:
         await update.message.reply_text("❌ Use @username format!")
         return
     
-    username = target[1:]
-    from database import db
-    user_doc = db.users.find_one({"username": username})
-    
-    if not user_doc:
+    if target_user_id is None:
         await update.message.reply_text("❌ User not found!")
         return
     
+    # With a tournament ID the payment is declined and any slot it held goes to the waitlist
+    if len(context.args) > 1:
+        tournament_id = context.args[1]
+        decline_payment(target_user_id, tournament_id, actor=user_id)
+        if remove_participant(tournament_id, target_user_id, actor=user_id):
+            promoted = await release_slots(context.bot, tournament_id)
+            if promoted:
+                await update.message.reply_text(f"🔁 Slot offered to {len(promoted)} waitlisted player(s)")
+    
     # Notify user
     try:
         await context.bot.send_message(
-            chat_id=user_doc['user_id'],
+            chat_id=target_user_id,
             text="❌ Payment not received or invalid. Please check and send again."
         )
     except:
         pass
     
-    await update.message.reply_text(f"❌ Payment declined for @{username}!")
+    await update.message.reply_text(f"❌ Payment declined for {target}!")
 
 async def approve_ai_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /approve_ai command"""
@@ -865,7 +1108,8 @@ async def approve_ai_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
         'prize_type': suggestion['prize_type'],
         'prize_info': f"{suggestion['prize_type']} prizes",
         'ai_generated': True,
-        'ai_confidence': suggestion['confidence']
+        'ai_confidence': suggestion['confidence'],
+        'max_slots': suggestion['optimal_participants']
     }
     
     # Create tournament in database
@@ -946,4 +1190,3 @@ async def ai_analytics_command(update: Update, context: ContextTypes.DEFAULT_TYP
 🧠 AI suggests focusing on {optimal_timing['slot_quality'].lower()} slots for maximum engagement!"""
     
     await update.message.reply_text(msg, parse_mode='Markdown')
-    await update.message.reply_text(f"❌ Payment declined for @{username}!")
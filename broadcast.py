@@ -0,0 +1,68 @@
+"""
+Resumable direct-message broadcasts for No Mercy Zone Bot
+"""
+
+import asyncio
+from telegram.error import RetryAfter
+from database import (
+    BROADCAST_CHECKPOINT_EVERY, create_broadcast, save_broadcast_progress, get_unfinished_broadcasts
+)
+from tasks import spawn
+from waitlist import NOTIFY_DELAY
+
+
+async def run_broadcast(bot, broadcast):
+    """Send a broadcast from its recorded position, checkpointing progress as it goes"""
+    recipients = broadcast["recipients"]
+    position = broadcast["position"]
+    delivered = broadcast["delivered"]
+
+    try:
+        while position < len(recipients):
+            try:
+                await bot.send_message(
+                    chat_id=recipients[position],
+                    text=broadcast["text"],
+                    parse_mode=broadcast.get("parse_mode")
+                )
+                delivered += 1
+            except RetryAfter as e:
+                await asyncio.sleep(e.retry_after)
+                continue
+            except Exception as e:
+                print(f"Broadcast to {recipients[position]} failed: {e}")
+
+            position += 1
+            if position % BROADCAST_CHECKPOINT_EVERY == 0:
+                await asyncio.to_thread(save_broadcast_progress, broadcast["_id"], position, delivered)
+            await asyncio.sleep(NOTIFY_DELAY)
+    finally:
+        # Written synchronously so it also lands when the task is cancelled at shutdown
+        save_broadcast_progress(broadcast["_id"], position, delivered, finished=position >= len(recipients))
+
+    if broadcast.get("report_chat_id"):
+        try:
+            await bot.send_message(
+                chat_id=broadcast["report_chat_id"],
+                text=f"✅ {broadcast.get('label', 'Broadcast')} sent to {delivered}/{len(recipients)} participants"
+            )
+        except Exception as e:
+            print(f"Failed to report broadcast result: {e}")
+
+    return delivered
+
+
+async def start_broadcast(bot, text, user_ids, parse_mode=None, label=None, report_chat_id=None):
+    """Record and start a broadcast; shutdown lets it finish or checkpoints it for resume"""
+    broadcast = await asyncio.to_thread(
+        create_broadcast, text, user_ids, parse_mode, label=label, report_chat_id=report_chat_id
+    )
+    return spawn(run_broadcast(bot, broadcast), drain=True)
+
+
+async def resume_broadcasts(bot):
+    """Continue broadcasts that a previous run didn't finish"""
+    broadcasts = await asyncio.to_thread(get_unfinished_broadcasts)
+    for broadcast in broadcasts:
+        spawn(run_broadcast(bot, broadcast), drain=True)
+    return len(broadcasts)
@@ -0,0 +1,94 @@
+"""
+Live channel tournament posts for No Mercy Zone Bot
+"""
+
+import asyncio
+import time
+from telegram import InlineKeyboardMarkup
+from telegram.error import BadRequest, RetryAfter
+from database import get_channel_post_state
+from messages import get_tournament_post, get_tournament_live_status
+
+# Telegram throttles edits per message; keep at most one edit per post in this window
+POST_EDIT_INTERVAL = 5
+
+_dirty_posts = set()
+_last_edit = {}
+
+
+def build_channel_post(tournament):
+    """Text and join button for a tournament's channel post"""
+    text = f"""{get_tournament_post(tournament)}
+
+{get_tournament_live_status(tournament)}
+
+⏰ Room ID & Password will be shared 10 minutes before match starts!"""
+
+    reply_markup = None
+    is_full = tournament.get("participant_count", 0) >= tournament.get("max_slots", float("inf"))
+    if tournament.get("status", "upcoming") == "upcoming" and not is_full:
+        # Plain Bot API dict so it can also be stored in the outbox
+        reply_markup = {"inline_keyboard": [[
+            {"text": "🎮 JOIN TOURNAMENT", "callback_data": f"join_tournament_{tournament['tournament_id']}"}
+        ]]}
+
+    return {"text": text, "reply_markup": reply_markup, "parse_mode": "Markdown"}
+
+
+def mark_post_dirty(tournament_id):
+    """Request a refresh of the tournament's channel post; repeated calls coalesce"""
+    _dirty_posts.add(tournament_id)
+
+
+async def refresh_post(bot, tournament_id):
+    """Re-render one channel post from the current tournament state"""
+    tournament = await asyncio.to_thread(get_channel_post_state, tournament_id)
+    if not tournament or not tournament.get("channel_message_id"):
+        return
+
+    post = build_channel_post(tournament)
+    reply_markup = post["reply_markup"] and InlineKeyboardMarkup.de_json(post["reply_markup"], bot)
+
+    try:
+        await bot.edit_message_text(
+            chat_id=tournament["channel_chat_id"],
+            message_id=tournament["channel_message_id"],
+            text=post["text"],
+            reply_markup=reply_markup,
+            parse_mode=post["parse_mode"]
+        )
+    except BadRequest as e:
+        if "not modified" not in str(e).lower():
+            raise
+
+
+async def run_post_editor(bot, interval=1):
+    """Flush dirty posts, editing each at most once per POST_EDIT_INTERVAL"""
+    while True:
+        await asyncio.sleep(interval)
+        now = time.monotonic()
+
+        for tournament_id in list(_dirty_posts):
+            if now - _last_edit.get(tournament_id, 0) < POST_EDIT_INTERVAL:
+                continue
+
+            _dirty_posts.discard(tournament_id)
+            _last_edit[tournament_id] = now
+
+            try:
+                await refresh_post(bot, tournament_id)
+            except RetryAfter as e:
+                _dirty_posts.add(tournament_id)
+                _last_edit[tournament_id] = now + e.retry_after
+            except Exception as e:
+                print(f"Failed to refresh channel post for {tournament_id}: {e}")
+
+
+async def flush_dirty_posts(bot):
+    """Apply every pending post edit now, ignoring the rate limit (used at shutdown)"""
+    for tournament_id in list(_dirty_posts):
+        _dirty_posts.discard(tournament_id)
+        try:
+            await refresh_post(bot, tournament_id)
+        except Exception as e:
+            print(f"Failed to refresh channel post for {tournament_id}: {e}")
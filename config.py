@@ -52,3 +52,42 @@ ENTRY_FEES = {
     "duo": 80,
     "squad": 200
 }
+
+# Telegram Limits
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+# Tournament Capacity (BGMI custom rooms hold 100 players)
+MAX_SLOTS = {
+    "solo": 100,
+    "duo": 50,
+    "squad": 25
+}
+
+# Waitlist: how long a promoted user has to claim the freed slot
+WAITLIST_OFFER_MINUTES = 30
+
+# Pending payments: the admin gets a digest of ones older than this (at most every
+# PAYMENT_DIGEST_HOURS); payments for tournaments that have started are expired
+PENDING_PAYMENT_STALE_HOURS = 6
+PAYMENT_DIGEST_HOURS = 3
+PAYMENT_SWEEP_MINUTES = 15
+
+# Lifecycle: tournaments count as completed this long after their slot; completed
+# tournaments and settled payments move to archive collections after ARCHIVE_AFTER_DAYS
+TOURNAMENT_DURATION_HOURS = 3
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "90"))
+ARCHIVE_BATCH_SIZE = 200
+
+# Admin dashboard: counters are kept in memory and re-read from Mongo this often
+DASHBOARD_REFRESH_SECONDS = 30
+
+# Shutdown: seconds to let broadcasts and in-flight jobs finish (Heroku kills after 30)
+SHUTDOWN_GRACE_SECONDS = 20
+
+# Telegram HTTP client: outgoing calls (replies, broadcasts, channel edits) and
+# long polling use separate connection pools so fan-out never starves get_updates
+TELEGRAM_POOL_SIZE = int(os.getenv("TELEGRAM_POOL_SIZE", "64"))
+TELEGRAM_POOL_TIMEOUT = float(os.getenv("TELEGRAM_POOL_TIMEOUT", "5"))
+TELEGRAM_GET_UPDATES_POOL_SIZE = 2
+# "2" needs the h2 package (python-telegram-bot[http2]); falls back to "1.1" without it
+TELEGRAM_HTTP_VERSION = os.getenv("TELEGRAM_HTTP_VERSION", "2")
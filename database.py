@@ -1,26 +1,22 @@
 """Database operations for No Mercy Zone Bot (Fixed Version + Async Stubs)"""
 
-from pymongo import MongoClient
+from pymongo import MongoClient, ReplaceOne, ReturnDocument, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
 from datetime import datetime, timezone, timedelta
 import random
 import string
-from config import MONGODB_URI, DATABASE_NAME
+import threading
+import time
+from collections import OrderedDict
+from itertools import islice
+from config import MONGODB_URI, DATABASE_NAME, MAX_SLOTS, WAITLIST_OFFER_MINUTES
+from models import User, Tournament, Payment
+from cache import LRUCache
 
-# Connect to MongoDB
-try:
-    client = MongoClient(MONGODB_URI)
-    db = client[DATABASE_NAME]
-
-    # Create indexes
-    db.users.create_index("user_id", unique=True)
-    db.tournaments.create_index("tournament_id", unique=True)
-    db.payments.create_index([("user_id", 1), ("tournament_id", 1)], unique=True)
-    db.referrals.create_index("referrer_id")
-
-    print("✅ Database connected successfully!")
-
-except Exception as e:
-    print(f"❌ Database connection failed: {e}")
+# Connect to MongoDB lazily: the first query opens the connection, so importing
+# this module costs no network round-trips. Indexes are created in init_database.
+client = MongoClient(MONGODB_URI, connect=False)
+db = client[DATABASE_NAME]
 
 
 # === Core Functions ===
@@ -49,32 +45,273 @@ def create_user(user_id, username, first_name):
         "tournaments_joined": [],
         "total_spent": 0,
         "total_earned": 0,
+        "tournaments_played": 0,
+        "wins": 0,
+        "kills": 0,
         "payments": []
     }
+    if username:
+        user_data["username_lower"] = username.lower()
+        # The username may still be recorded on an account that gave it up
+        db.users.update_many(
+            {"username_lower": user_data["username_lower"], "user_id": {"$ne": user_id}},
+            {"$unset": {"username_lower": ""}}
+        )
     try:
         db.users.insert_one(user_data)
         return user_data
-    except:
+    except DuplicateKeyError:
+        # Created concurrently by another update from the same user
         return db.users.find_one({"user_id": user_id})
 
 
+# === Referrals ===
+
+# Referral code -> referrer user_id; codes never change once issued
+_referral_cache = LRUCache(maxsize=5000)
+
+
+def resolve_referral_code(code):
+    """Get the user_id that owns a referral code, or None"""
+    code = code.upper()
+    referrer_id = _referral_cache.get(code)
+    if referrer_id is not None:
+        return referrer_id
+
+    user_doc = db.users.find_one({"referral_code": code}, {"_id": 0, "user_id": 1})
+    if not user_doc:
+        return None
+
+    _referral_cache.set(code, user_doc["user_id"])
+    return user_doc["user_id"]
+
+
+def credit_referral(code, referred_id):
+    """Credit the code's owner with one free entry; returns referrer_id, or None if not credited
+
+    The unique index on referrals.referred_id makes this idempotent per referred user.
+    """
+    referrer_id = resolve_referral_code(code)
+    if referrer_id is None or referrer_id == referred_id:
+        return None
+
+    try:
+        db.referrals.insert_one({
+            "referrer_id": referrer_id,
+            "referred_id": referred_id,
+            "code": code.upper(),
+            "created_at": datetime.now(timezone.utc)
+        })
+    except DuplicateKeyError:
+        return None
+
+    db.users.update_one(
+        {"user_id": referrer_id},
+        {"$inc": {"free_entries": 1, "referral_count": 1}}
+    )
+    return referrer_id
+
+
 def get_user(user_id):
     return db.users.find_one({"user_id": user_id})
 
 
+def load_user(user_id, fields=None):
+    """Get a User model, fetching only the requested fields"""
+    return User.from_doc(db.users.find_one({"user_id": user_id}, User.projection(fields)))
+
+
 def update_user(user_id, update_data):
     return db.users.update_one({"user_id": user_id}, {"$set": update_data})
 
 
-def create_tournament(tournament_data):
+def ban_user(user_id, actor=None):
+    result = db.users.update_one({"user_id": user_id, "banned": {"$ne": True}}, {"$set": {"banned": True}})
+    if result.matched_count:
+        _banned_ids.add(user_id)
+    if result.modified_count:
+        log_event("banned", user_id=user_id, actor=actor)
+    return result
+
+
+def unban_user(user_id, actor=None):
+    result = db.users.update_one({"user_id": user_id, "banned": True}, {"$set": {"banned": False}})
+    _banned_ids.discard(user_id)
+    if result.modified_count:
+        log_event("unbanned", user_id=user_id, actor=actor)
+    return result
+
+
+# === Ban list ===
+
+# Banned user_ids, checked on every update without a DB round-trip
+_banned_ids = set()
+_stop_watching = threading.Event()
+
+
+def is_banned(user_id):
+    return user_id in _banned_ids
+
+
+def load_banned_users():
+    """Replace the in-memory ban list with what's stored"""
+    global _banned_ids
+    _banned_ids = {doc["user_id"] for doc in db.users.find({"banned": True}, {"_id": 0, "user_id": 1})}
+    return len(_banned_ids)
+
+
+def watch_banned_users():
+    """Follow bans made by other instances via a change stream
+
+    Blocks until stop_watching_bans() is called. Returns False straight away
+    when the server doesn't support change streams (standalone mongod).
+    """
+    pipeline = [
+        {"$match": {
+            "operationType": "update",
+            "updateDescription.updatedFields.banned": {"$exists": True}
+        }},
+        {"$project": {"fullDocument.user_id": 1, "fullDocument.banned": 1}}
+    ]
+
+    _stop_watching.clear()
+    while not _stop_watching.is_set():
+        try:
+            with db.users.watch(pipeline, full_document="updateLookup", max_await_time_ms=1000) as stream:
+                # Catch anything that changed while the stream was down
+                load_banned_users()
+                while stream.alive and not _stop_watching.is_set():
+                    change = stream.try_next()
+                    doc = change and change.get("fullDocument")
+                    if not doc:
+                        continue
+                    if doc.get("banned"):
+                        _banned_ids.add(doc["user_id"])
+                    else:
+                        _banned_ids.discard(doc["user_id"])
+        except OperationFailure as e:
+            print(f"Ban change stream unavailable: {e}")
+            return False
+        except Exception as e:
+            print(f"Ban change stream error: {e}")
+            _stop_watching.wait(5)
+    return True
+
+
+def stop_watching_bans():
+    """Let watch_banned_users return so its worker thread can exit"""
+    _stop_watching.set()
+
+
+# === Username index ===
+
+# Lowercased username -> user_id for admin commands
+_username_cache = LRUCache(maxsize=5000)
+
+# user_id -> (username, first_name) as last written, and changes waiting to be flushed
+_profile_cache = LRUCache(maxsize=20000)
+_pending_profiles = {}
+
+
+def resolve_username(username):
+    """Get the user_id for a @username (case-insensitive), or None"""
+    username_lower = username.lstrip("@").lower()
+    user_id = _username_cache.get(username_lower)
+    if user_id is not None:
+        return user_id
+
+    user_doc = db.users.find_one({"username_lower": username_lower}, {"_id": 0, "user_id": 1})
+    if not user_doc:
+        return None
+
+    _username_cache.set(username_lower, user_doc["user_id"])
+    return user_doc["user_id"]
+
+
+def note_user_profile(user_id, username, first_name):
+    """Queue a username/first_name refresh if they differ from what was last written"""
+    profile = (username, first_name)
+    previous = _profile_cache.get(user_id)
+    if previous == profile:
+        return
+
+    _profile_cache.set(user_id, profile)
+    _pending_profiles[user_id] = profile
+
+    if previous and previous[0] and previous[0] != username:
+        _username_cache.pop(previous[0].lower())
+    if username:
+        _username_cache.set(username.lower(), user_id)
+
+
+def flush_user_profiles():
+    """Write queued profile changes in one ordered bulk write"""
+    global _pending_profiles
+    if not _pending_profiles:
+        return 0
+
+    pending, _pending_profiles = _pending_profiles, {}
+    operations = []
+
+    for user_id, (username, first_name) in list(pending.items()):
+        changed = {"$or": [{"username": {"$ne": username}}, {"first_name": {"$ne": first_name}}]}
+        if username:
+            username_lower = username.lower()
+            # Telegram usernames move between accounts; release it from any stale holder first
+            operations.append(UpdateMany(
+                {"username_lower": username_lower, "user_id": {"$ne": user_id}},
+                {"$unset": {"username_lower": ""}}
+            ))
+            update = {"$set": {"username": username, "username_lower": username_lower, "first_name": first_name}}
+        else:
+            update = {"$set": {"username": None, "first_name": first_name}, "$unset": {"username_lower": ""}}
+        operations.append(UpdateOne({"user_id": user_id, **changed}, update))
+
+    try:
+        db.users.bulk_write(operations, ordered=True)
+    except Exception:
+        # Forget what we thought was written so the next update re-queues it
+        for user_id in pending:
+            _profile_cache.pop(user_id)
+        raise
+
+    return len(pending)
+
+
+def run_transaction(callback):
+    """Run callback(session) in a transaction, or without one on a standalone server"""
+    with client.start_session() as session:
+        try:
+            return session.with_transaction(callback)
+        except OperationFailure as e:
+            # Error 20: transactions need a replica set (local development)
+            if e.code != 20:
+                raise
+    return callback(None)
+
+
+def create_tournament(tournament_data, announcement=None):
+    """Create a tournament; announcement(tournament) returns an outbox message written atomically with it"""
     tournament_id = 'TN' + ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
     tournament_data["tournament_id"] = tournament_id
     tournament_data["created_at"] = datetime.now(timezone.utc)
-    tournament_data["participants"] = []
+    tournament_data["participant_count"] = 0
     tournament_data["status"] = "upcoming"
     tournament_data["confirmed_payments"] = 0
+    tournament_data.setdefault("max_slots", MAX_SLOTS.get(tournament_data.get("type"), 100))
+
+    if announcement is None:
+        db.tournaments.insert_one(tournament_data)
+    else:
+        message = announcement(tournament_data)
 
-    db.tournaments.insert_one(tournament_data)
+        def insert(session):
+            db.tournaments.insert_one(tournament_data, session=session)
+            enqueue_outbox(tournament_id=tournament_id, session=session, **message)
+
+        run_transaction(insert)
+
+    _note_tournament_status(tournament_id, "upcoming", tournament_data)
     return tournament_data
 
 
@@ -82,10 +319,228 @@ def get_tournament(tournament_id):
     return db.tournaments.find_one({"tournament_id": tournament_id})
 
 
+def update_tournament(tournament_id, update_data):
+    result = db.tournaments.update_one({"tournament_id": tournament_id}, {"$set": update_data})
+    if "status" in update_data and result.modified_count:
+        _note_tournament_status(tournament_id, update_data["status"])
+    return result
+
+
+def load_tournament(tournament_id, fields=None):
+    """Get a Tournament model"""
+    return Tournament.from_doc(
+        db.tournaments.find_one({"tournament_id": tournament_id}, Tournament.projection(fields))
+    )
+
+
+# Everything a channel post needs
+CHANNEL_POST_PROJECTION = {
+    "_id": 0, "tournament_id": 1, "name": 1, "type": 1, "date": 1, "time": 1, "map": 1,
+    "entry_fee": 1, "prize_info": 1, "status": 1, "max_slots": 1, "participant_count": 1,
+    "channel_chat_id": 1, "channel_message_id": 1
+}
+
+
+def get_channel_post_state(tournament_id):
+    """Get the fields needed to re-render a tournament's channel post"""
+    return db.tournaments.find_one({"tournament_id": tournament_id}, CHANNEL_POST_PROJECTION)
+
+
+def scheduled_at(tournament):
+    """A tournament's start as an IST datetime, or None if its date/time can't be parsed
+
+    /host accepts times like "9:30", so the stored strings don't sort chronologically.
+    """
+    try:
+        return datetime.strptime(f"{tournament['date']} {tournament['time']}", "%Y-%m-%d %H:%M").replace(tzinfo=IST)
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
 def get_active_tournaments():
     return list(db.tournaments.find({"status": {"$in": ["upcoming", "live"]}}))
 
 
+def load_active_tournaments(fields=None):
+    """Get Tournament models for upcoming and live tournaments"""
+    cursor = db.tournaments.find(
+        {"status": {"$in": ["upcoming", "live"]}},
+        Tournament.projection(fields)
+    )
+    return [Tournament.from_doc(doc) for doc in cursor]
+
+
+# Fields copied from the user profile into the enrolment on joining
+ROSTER_PROJECTION = {"_id": 0, "user_id": 1, "username": 1, "first_name": 1}
+ENROLMENT_PROJECTION = {"_id": 0, "user_id": 1, "username": 1, "first_name": 1, "paid": 1}
+
+
+def make_roster_entry(user_doc, paid):
+    """Build the denormalised enrolment entry for a player"""
+    return {
+        "user_id": user_doc["user_id"],
+        "username": user_doc.get("username"),
+        "first_name": user_doc.get("first_name"),
+        "paid": paid
+    }
+
+
+def get_tournament_participants(tournament_id):
+    """Get roster entries (user_id, username, first_name, paid) for a tournament"""
+    return list(db.enrolments.find({"tournament_id": tournament_id}, ENROLMENT_PROJECTION).sort("joined_at", 1))
+
+
+def migrate_participants():
+    """Move embedded participants/roster arrays into the enrolments collection"""
+    migrated = 0
+    for tournament in db.tournaments.find(
+        {"participants": {"$exists": True}},
+        {"_id": 0, "tournament_id": 1, "participants": 1, "roster": 1, "created_at": 1}
+    ):
+        tournament_id = tournament["tournament_id"]
+        participant_ids = tournament.get("participants") or []
+        entries = {entry["user_id"]: entry for entry in tournament.get("roster") or []}
+
+        missing = [uid for uid in participant_ids if uid not in entries]
+        if missing:
+            for profile in db.users.find({"user_id": {"$in": missing}}, {**ROSTER_PROJECTION, "confirmed": 1}):
+                entries[profile["user_id"]] = make_roster_entry(profile, profile.get("confirmed", False))
+
+        operations = [
+            UpdateOne(
+                {"tournament_id": tournament_id, "user_id": uid},
+                {"$setOnInsert": {
+                    "username": entries.get(uid, {}).get("username"),
+                    "first_name": entries.get(uid, {}).get("first_name"),
+                    "paid": entries.get(uid, {}).get("paid", False),
+                    "joined_at": tournament.get("created_at")
+                }},
+                upsert=True
+            )
+            for uid in participant_ids
+        ]
+        if operations:
+            db.enrolments.bulk_write(operations, ordered=False)
+
+        # Counted from enrolments so joins recorded since then aren't overwritten
+        db.tournaments.update_one(
+            {"tournament_id": tournament_id},
+            {
+                "$set": {"participant_count": db.enrolments.count_documents({"tournament_id": tournament_id})},
+                "$unset": {"participants": "", "roster": ""}
+            }
+        )
+        migrated += 1
+
+    return migrated
+
+
+def reconcile_participant_counts():
+    """Fix participant_count on live tournaments from their enrolments"""
+    # Upcoming tournaments are skipped: participant_count gates admission there,
+    # and a join between the count and the fix would be erased, overfilling it
+    observed = {
+        t["tournament_id"]: t.get("participant_count", 0)
+        for t in db.tournaments.find({"status": "live"}, {"_id": 0, "tournament_id": 1, "participant_count": 1})
+    }
+    if not observed:
+        return 0
+    counts = {
+        row["_id"]: row["count"]
+        for row in db.enrolments.aggregate([
+            {"$match": {"tournament_id": {"$in": list(observed)}}},
+            {"$group": {"_id": "$tournament_id", "count": {"$sum": 1}}}
+        ])
+    }
+    # Only overwrite the value that was read, so a concurrent change wins
+    fixes = [
+        UpdateOne(
+            {"tournament_id": tid, "participant_count": count},
+            {"$set": {"participant_count": counts.get(tid, 0)}}
+        )
+        for tid, count in observed.items()
+        if count != counts.get(tid, 0)
+    ]
+    if not fixes:
+        return 0
+    return db.tournaments.bulk_write(fixes, ordered=False).modified_count
+
+
+# join_tournament / join_tournament_with_free_entry results
+JOIN_OK = "joined"
+JOIN_ALREADY = "already_joined"
+JOIN_FULL = "full"
+JOIN_CLOSED = "closed"
+JOIN_UNPAID = "unpaid"
+JOIN_NO_FREE_ENTRY = "no_free_entry"
+
+
+def is_user_joined_tournament(user_id, tournament_id):
+    return db.enrolments.count_documents(
+        {"tournament_id": tournament_id, "user_id": user_id}, limit=1
+    ) > 0
+
+
+# Slots taken by participants plus slots held for promoted waitlist users
+_TAKEN_SLOTS = {"$add": [{"$ifNull": ["$participant_count", 0]}, {"$ifNull": ["$held_slots", 0]}]}
+_MAX_SLOTS = {"$ifNull": ["$max_slots", 100]}
+
+
+def _reserve_slot(tournament_id, user_id, paid):
+    """Bump participant_count using the user's held waitlist slot, or a free slot"""
+    increments = {"participant_count": 1, "confirmed_payments": 1 if paid else 0}
+
+    # A promoted waitlist user converts their held slot first, so it isn't
+    # left locked until the offer expires while they take a free one
+    if claim_waitlist_offer(tournament_id, user_id):
+        result = db.tournaments.update_one(
+            {"tournament_id": tournament_id, "status": "upcoming", "held_slots": {"$gt": 0}},
+            {"$inc": {**increments, "held_slots": -1}}
+        )
+        if result.modified_count > 0:
+            return True
+
+    result = db.tournaments.update_one(
+        {
+            "tournament_id": tournament_id,
+            "status": "upcoming",
+            "$expr": {"$lt": [_TAKEN_SLOTS, _MAX_SLOTS]}
+        },
+        {"$inc": increments}
+    )
+    return result.modified_count > 0
+
+
+def admit_participant(tournament_id, user_doc, paid):
+    """Claim a slot with one conditional update, then record the enrolment; never admits beyond max_slots"""
+    user_id = user_doc["user_id"]
+    if is_user_joined_tournament(user_id, tournament_id):
+        return JOIN_ALREADY
+
+    if not _reserve_slot(tournament_id, user_id, paid):
+        tournament = db.tournaments.find_one({"tournament_id": tournament_id}, {"_id": 0, "status": 1})
+        if not tournament or tournament.get("status") != "upcoming":
+            return JOIN_CLOSED
+        return JOIN_FULL
+
+    try:
+        db.enrolments.insert_one({
+            "tournament_id": tournament_id,
+            **make_roster_entry(user_doc, paid),
+            "joined_at": datetime.now(timezone.utc)
+        })
+    except DuplicateKeyError:
+        # Lost a race with a concurrent join by the same user: give the slot back
+        db.tournaments.update_one(
+            {"tournament_id": tournament_id},
+            {"$inc": {"participant_count": -1, "confirmed_payments": -1 if paid else 0}}
+        )
+        return JOIN_ALREADY
+
+    note_activity(user_id, "joins")
+    return JOIN_OK
+
+
 def join_tournament(user_id, tournament_id):
     payment = db.payments.find_one({
         "user_id": user_id,
@@ -94,25 +549,173 @@ def join_tournament(user_id, tournament_id):
     })
 
     if not payment:
-        return False
+        return JOIN_UNPAID
 
-    tournament_update = db.tournaments.update_one(
-        {"tournament_id": tournament_id},
+    user_doc = db.users.find_one({"user_id": user_id}, ROSTER_PROJECTION)
+    if not user_doc:
+        return JOIN_CLOSED
+
+    result = admit_participant(tournament_id, user_doc, True)
+    if result != JOIN_OK:
+        return result
+
+    db.users.update_one(
+        {"user_id": user_id},
         {
-            "$addToSet": {"participants": user_id},
-            "$inc": {"confirmed_payments": 1}
+            "$addToSet": {"tournaments_joined": tournament_id},
+            "$inc": {"tournaments_played": 1}
         }
     )
 
-    user_update = db.users.update_one(
+    return JOIN_OK
+
+
+def join_tournament_with_free_entry(user_id, tournament_id):
+    """Spend one referral free entry on a slot; the entry is refunded if no slot is left"""
+    user_doc = db.users.find_one_and_update(
+        {"user_id": user_id, "free_entries": {"$gt": 0}},
+        {"$inc": {"free_entries": -1}},
+        projection=ROSTER_PROJECTION
+    )
+
+    if not user_doc:
+        return JOIN_NO_FREE_ENTRY
+
+    result = admit_participant(tournament_id, user_doc, False)
+    if result != JOIN_OK:
+        db.users.update_one({"user_id": user_id}, {"$inc": {"free_entries": 1}})
+        return result
+
+    db.users.update_one(
         {"user_id": user_id},
         {
             "$addToSet": {"tournaments_joined": tournament_id},
-            "$inc": {"total_spent": payment["amount"]}
+            "$inc": {"tournaments_played": 1}
         }
     )
+    return JOIN_OK
+
+
+def claim_waitlist_offer(tournament_id, user_id):
+    """Mark an unexpired promotion offer as used; True if the user had one"""
+    result = db.waitlist.update_one(
+        {
+            "tournament_id": tournament_id,
+            "user_id": user_id,
+            "status": "offered",
+            "offer_expires_at": {"$gt": datetime.now(timezone.utc)}
+        },
+        {"$set": {"status": "claimed", "claimed_at": datetime.now(timezone.utc)}}
+    )
+    return result.modified_count > 0
+
+
+def promote_waitlist(tournament_id):
+    """Offer every free slot to the oldest waiting users; returns the promoted user_ids"""
+    promoted = []
+    offer_expires_at = datetime.now(timezone.utc) + timedelta(minutes=WAITLIST_OFFER_MINUTES)
+
+    while True:
+        # Hold the slot first so regular joins can't take it while we pick a user
+        held = db.tournaments.update_one(
+            {
+                "tournament_id": tournament_id,
+                "status": "upcoming",
+                "$expr": {"$lt": [_TAKEN_SLOTS, _MAX_SLOTS]}
+            },
+            {"$inc": {"held_slots": 1}}
+        )
+        if held.modified_count == 0:
+            break
+
+        entry = db.waitlist.find_one_and_update(
+            {"tournament_id": tournament_id, "status": "waiting"},
+            {"$set": {"status": "offered", "offer_expires_at": offer_expires_at}},
+            sort=[("joined_at", 1)],
+            projection={"_id": 0, "user_id": 1}
+        )
+        if not entry or is_user_joined_tournament(entry["user_id"], tournament_id):
+            db.tournaments.update_one({"tournament_id": tournament_id}, {"$inc": {"held_slots": -1}})
+            if not entry:
+                break
+            continue
+
+        promoted.append(entry["user_id"])
+
+    return promoted
+
+
+def expire_waitlist_offers(batch_size=200):
+    """Expire lapsed offers, free their held slots and promote the next users
+
+    Returns {tournament_id: [promoted user_ids]} for notification.
+    """
+    now = datetime.now(timezone.utc)
+    expired = list(db.waitlist.find(
+        {"status": "offered", "offer_expires_at": {"$lte": now}},
+        {"_id": 1, "tournament_id": 1}
+    ).limit(batch_size))
+
+    released = {}
+    for entry in expired:
+        result = db.waitlist.update_one(
+            {"_id": entry["_id"], "status": "offered"},
+            {"$set": {"status": "expired"}}
+        )
+        if result.modified_count > 0:
+            released[entry["tournament_id"]] = released.get(entry["tournament_id"], 0) + 1
+
+    promotions = {}
+    for tournament_id, count in released.items():
+        db.tournaments.update_one(
+            {"tournament_id": tournament_id, "held_slots": {"$gte": count}},
+            {"$inc": {"held_slots": -count}}
+        )
+        promotions[tournament_id] = promote_waitlist(tournament_id)
+
+    return promotions
+
+
+def join_waitlist(tournament_id, user_id):
+    """Add a user to a full tournament's FIFO waitlist; returns their position"""
+    db.waitlist.update_one(
+        {"tournament_id": tournament_id, "user_id": user_id},
+        {"$setOnInsert": {"status": "waiting", "joined_at": datetime.now(timezone.utc)}},
+        upsert=True
+    )
+    entry = db.waitlist.find_one({"tournament_id": tournament_id, "user_id": user_id})
+    return db.waitlist.count_documents({
+        "tournament_id": tournament_id,
+        "status": "waiting",
+        "joined_at": {"$lte": entry["joined_at"]}
+    })
+
+
+def remove_participant(tournament_id, user_id, actor=None):
+    """Remove a player's enrolment and free their slot; returns True if they were enrolled"""
+    result = db.enrolments.delete_one({"tournament_id": tournament_id, "user_id": user_id})
+    if not result.deleted_count:
+        return False
+    db.tournaments.update_one({"tournament_id": tournament_id}, {"$inc": {"participant_count": -1}})
+    log_event("player_removed", user_id=user_id, tournament_id=tournament_id, actor=actor)
+    return True
 
-    return tournament_update.modified_count > 0 and user_update.modified_count > 0
+
+def delete_tournament(tournament_id, actor=None):
+    """Delete a tournament, keeping a record of who was in it"""
+    tournament = db.tournaments.find_one_and_delete(
+        {"tournament_id": tournament_id},
+        projection={"_id": 0, "name": 1, "participant_count": 1, "total_collected": 1}
+    )
+    if tournament:
+        db.enrolments.delete_many({"tournament_id": tournament_id})
+        _note_tournament_status(tournament_id, None)
+        log_event(
+            "tournament_deleted", tournament_id=tournament_id, actor=actor,
+            name=tournament.get("name"), players=tournament.get("participant_count", 0),
+            collected=tournament.get("total_collected", 0)
+        )
+    return tournament
 
 
 def create_payment_request(user_id, tournament_id, amount, utr):
@@ -123,6 +726,8 @@ def create_payment_request(user_id, tournament_id, amount, utr):
 
     if existing_payment:
         if existing_payment["status"] != "confirmed":
+            if existing_payment["status"] != "pending":
+                _bump_dashboard(pending_payments=1)
             db.payments.update_one(
                 {"_id": existing_payment["_id"]},
                 {"$set": {
@@ -147,6 +752,7 @@ def create_payment_request(user_id, tournament_id, amount, utr):
     }
 
     db.payments.insert_one(payment_data)
+    _bump_dashboard(pending_payments=1)
     db.users.update_one(
         {"user_id": user_id},
         {"$push": {"payments": {
@@ -161,46 +767,114 @@ def create_payment_request(user_id, tournament_id, amount, utr):
     return payment_data
 
 
-def confirm_payment(user_id, tournament_id):
-    payment_update = db.payments.update_one(
-        {"user_id": user_id, "tournament_id": tournament_id},
-        {"$set": {
-            "status": "confirmed",
-            "confirmed_at": datetime.now(timezone.utc),
-            "updated_at": datetime.now(timezone.utc)
-        }}
-    )
+def _apply_confirmations(confirmed, now, session=None):
+    """Mirror newly confirmed payments onto users and tournaments in bulk"""
+    db.users.bulk_write([
+        UpdateOne(
+            {"user_id": p["user_id"], "payments.tournament_id": p["tournament_id"]},
+            {
+                "$set": {
+                    "payments.$.status": "confirmed",
+                    "confirmed": True,
+                    "payments.$.confirmed_at": now
+                },
+                "$inc": {"total_spent": p["amount"]}
+            }
+        )
+        for p in confirmed
+    ], ordered=False, session=session)
 
-    if payment_update.modified_count == 0:
-        return False
+    collected = {}
+    for p in confirmed:
+        collected[p["tournament_id"]] = collected.get(p["tournament_id"], 0) + p["amount"]
 
-    user_payment_update = db.users.update_one(
-        {
-            "user_id": user_id,
-            "payments.tournament_id": tournament_id
-        },
-        {"$set": {
-            "payments.$.status": "confirmed",
-            "confirmed": True,
-            "payments.$.confirmed_at": datetime.now(timezone.utc)
-        }}
-    )
+    db.tournaments.bulk_write([
+        UpdateOne({"tournament_id": tid}, {"$inc": {"total_collected": amount}})
+        for tid, amount in collected.items()
+    ], ordered=False, session=session)
 
-    payment = db.payments.find_one({
-        "user_id": user_id,
-        "tournament_id": tournament_id
-    })
 
-    if payment:
-        db.tournaments.update_one(
-            {"tournament_id": tournament_id},
-            {"$inc": {"total_collected": payment["amount"]}}
+def _log_confirmations(confirmed, actor=None, source=None):
+    _bump_dashboard(pending_payments=-len(confirmed))
+    _note_revenue(sum(p["amount"] for p in confirmed))
+    for p in confirmed:
+        log_event(
+            "payment_confirmed", user_id=p["user_id"], tournament_id=p["tournament_id"],
+            actor=actor, amount=p["amount"], utr=p.get("utr"), source=source
+        )
+
+
+def confirm_payment(user_id, tournament_id, actor=None):
+    now = datetime.now(timezone.utc)
+
+    # Payment, user and tournament totals change together or not at all
+    def confirm(session):
+        payment = db.payments.find_one_and_update(
+            {"user_id": user_id, "tournament_id": tournament_id, "status": {"$ne": "confirmed"}},
+            {"$set": {
+                "status": "confirmed",
+                "confirmed_at": now,
+                "updated_at": now
+            }},
+            projection={"_id": 0, "user_id": 1, "tournament_id": 1, "amount": 1, "utr": 1},
+            session=session
         )
+        if payment:
+            _apply_confirmations([payment], now, session)
+        return payment
 
-    return user_payment_update.modified_count > 0
+    payment = run_transaction(confirm)
+    if not payment:
+        return False
+
+    _log_confirmations([payment], actor)
+    return True
+
+
+def confirm_payments(entries, actor=None, source=None):
+    """Confirm many (user_id, tournament_id) payments in one bulk write; returns those confirmed"""
+    if not entries:
+        return []
+
+    # A unique confirmed_at lets us read back exactly the payments this call flipped
+    now = datetime.now(timezone.utc)
+
+    def confirm(session):
+        db.payments.bulk_write([
+            UpdateOne(
+                {"user_id": user_id, "tournament_id": tournament_id, "status": "pending"},
+                {"$set": {"status": "confirmed", "confirmed_at": now, "updated_at": now}}
+            )
+            for user_id, tournament_id in entries
+        ], ordered=False, session=session)
 
+        confirmed = list(db.payments.find(
+            {"status": "confirmed", "confirmed_at": now, "user_id": {"$in": [e[0] for e in entries]}},
+            {"_id": 0, "user_id": 1, "tournament_id": 1, "amount": 1, "utr": 1},
+            session=session
+        ))
+        if confirmed:
+            _apply_confirmations(confirmed, now, session)
+        return confirmed
 
-def decline_payment(user_id, tournament_id):
+    confirmed = run_transaction(confirm)
+    _log_confirmations(confirmed, actor, source)
+    return confirmed
+
+
+def get_pending_payment_index():
+    """Hash index of pending payments keyed by UTR for statement matching"""
+    return {
+        str(p["utr"]).strip(): p
+        for p in db.payments.find(
+            {"status": "pending"},
+            {"_id": 0, "user_id": 1, "tournament_id": 1, "amount": 1, "utr": 1}
+        )
+        if p.get("utr")
+    }
+
+
+def decline_payment(user_id, tournament_id, actor=None):
     payment_update = db.payments.update_one(
         {"user_id": user_id, "tournament_id": tournament_id},
         {"$set": {
@@ -221,9 +895,216 @@ def decline_payment(user_id, tournament_id):
         }}
     )
 
+    if payment_update.modified_count:
+        _bump_dashboard(pending_payments=-1)
+        log_event("payment_declined", user_id=user_id, tournament_id=tournament_id, actor=actor)
+
     return payment_update.modified_count > 0 and user_payment_update.modified_count > 0
 
 
+def get_user_stats(user_id, recent=10):
+    """Get the user's counters plus their most recent tournament IDs"""
+    return db.users.find_one(
+        {"user_id": user_id},
+        {
+            "_id": 0, "total_spent": 1, "total_earned": 1, "tournaments_played": 1,
+            "wins": 1, "kills": 1, "free_entries": 1,
+            "tournaments_joined": {"$slice": -recent}
+        }
+    )
+
+
+def get_recent_entries(user_id, tournament_ids):
+    """Get (tournament name, paid) for the given tournaments in two bounded queries (two more if some are archived)"""
+    names = {
+        t["tournament_id"]: t["name"]
+        for t in db.tournaments.find(
+            {"tournament_id": {"$in": tournament_ids}},
+            {"_id": 0, "tournament_id": 1, "name": 1}
+        )
+    }
+    paid = {
+        p["tournament_id"]
+        for p in db.payments.find(
+            {"user_id": user_id, "tournament_id": {"$in": tournament_ids}, "status": "confirmed"},
+            {"_id": 0, "tournament_id": 1}
+        )
+    }
+    # Older entries may have been archived
+    missing = [tid for tid in tournament_ids if tid not in names]
+    if missing:
+        names.update(
+            (t["tournament_id"], t["name"]) for t in db.tournaments_archive.find(
+                {"tournament_id": {"$in": missing}}, {"_id": 0, "tournament_id": 1, "name": 1}
+            )
+        )
+        paid.update(
+            p["tournament_id"] for p in db.payments_archive.find(
+                {"user_id": user_id, "tournament_id": {"$in": missing}, "status": "confirmed"},
+                {"_id": 0, "tournament_id": 1}
+            )
+        )
+    return [(names[tid], tid in paid) for tid in reversed(tournament_ids) if tid in names]
+
+
+def record_match_results(tournament_id, results):
+    """Store per-player results and bump earned/wins/kills counters in one transaction
+
+    results: dicts with user_id, kills, rank and prize. Returns False (writing
+    nothing) if results for this tournament were already recorded.
+    """
+    now = datetime.now(timezone.utc)
+
+    def record(session):
+        db.match_results.insert_many([
+            {"tournament_id": tournament_id, "recorded_at": now, **row} for row in results
+        ], session=session)
+
+        db.users.bulk_write([
+            UpdateOne(
+                {"user_id": row["user_id"]},
+                {"$inc": {
+                    "total_earned": row["prize"],
+                    "kills": row["kills"],
+                    "wins": 1 if row["rank"] == 1 else 0
+                }}
+            )
+            for row in results
+        ], ordered=False, session=session)
+
+    try:
+        run_transaction(record)
+    except BulkWriteError as e:
+        # A concurrent /results got there first; the ordered insert stops
+        # before the counters are touched, even without a transaction
+        if any(error["code"] != 11000 for error in e.details["writeErrors"]):
+            raise
+        return False
+    return True
+
+
+def update_leaderboards(boards, results, names):
+    """Add each player's prize/kills to every board in one bulk upsert"""
+    now = datetime.now(timezone.utc)
+    db.leaderboard.bulk_write([
+        UpdateOne(
+            {"board": board, "user_id": row["user_id"]},
+            {
+                "$inc": {"score": row["prize"], "kills": row["kills"], "wins": 1 if row["rank"] == 1 else 0},
+                "$set": {"name": names.get(row["user_id"]), "updated_at": now}
+            },
+            upsert=True
+        )
+        for board in boards for row in results
+    ], ordered=False)
+
+
+def get_leaderboard_entries(board):
+    """Stream a board's entries in rank order (used to rebuild the in-memory index)"""
+    return db.leaderboard.find(
+        {"board": board},
+        {"_id": 0, "user_id": 1, "score": 1, "kills": 1, "name": 1}
+    ).sort([("score", -1), ("kills", -1), ("user_id", 1)]).batch_size(1000)
+
+
+def get_kill_samples(tournament_type, map_name, limit=20000):
+    """Per-player kill counts from recorded results on this mode and map"""
+    # Results are kept when tournaments are archived, so archived ones still count
+    query = {"type": tournament_type, "map": map_name, "status": "completed"}
+    tournament_ids = [
+        t["tournament_id"]
+        for collection in (db.tournaments, db.tournaments_archive)
+        for t in collection.find(query, {"_id": 0, "tournament_id": 1})
+    ]
+    if not tournament_ids:
+        return []
+    return [
+        row["kills"] for row in db.match_results.find(
+            {"tournament_id": {"$in": tournament_ids}}, {"_id": 0, "kills": 1}
+        ).limit(limit)
+    ]
+
+
+def has_match_results(tournament_id):
+    return db.match_results.count_documents({"tournament_id": tournament_id}, limit=1) > 0
+
+
+STAT_FIELDS = ("tournaments_played", "total_spent", "total_earned", "wins", "kills")
+
+
+def _expected_stats(user_ids):
+    """Counters the given users should have, from the live source collections"""
+    expected = {user_id: dict.fromkeys(STAT_FIELDS, 0) for user_id in user_ids}
+    match = {"$match": {"user_id": {"$in": user_ids}}}
+
+    for row in db.enrolments.aggregate([
+        match,
+        {"$group": {"_id": "$user_id", "count": {"$sum": 1}}}
+    ]):
+        expected[row["_id"]]["tournaments_played"] = row["count"]
+
+    for row in db.payments.aggregate([
+        match,
+        {"$match": {"status": "confirmed"}},
+        {"$group": {"_id": "$user_id", "amount": {"$sum": "$amount"}}}
+    ]):
+        expected[row["_id"]]["total_spent"] = row["amount"]
+
+    for row in db.match_results.aggregate([
+        match,
+        {"$group": {
+            "_id": "$user_id",
+            "earned": {"$sum": "$prize"},
+            "kills": {"$sum": "$kills"},
+            "wins": {"$sum": {"$cond": [{"$eq": ["$rank", 1]}, 1, 0]}}
+        }}
+    ]):
+        expected[row["_id"]].update(total_earned=row["earned"], kills=row["kills"], wins=row["wins"])
+
+    return expected
+
+
+def _observed(value):
+    """Filter value matching a counter as read; a missing field was read as 0"""
+    return value if value else {"$in": [0, None]}
+
+
+def reconcile_user_stats(batch_size=500):
+    """Recompute counters from the source collections and fix any drift; returns users fixed"""
+    projection = {"_id": 0, "user_id": 1, "archived": 1, **{field: 1 for field in STAT_FIELDS}}
+    cursor = db.users.find({}, projection).batch_size(batch_size)
+    fixed = 0
+
+    while True:
+        batch = list(islice(cursor, batch_size))
+        if not batch:
+            break
+
+        # Users are read before their sources are counted, and each fix matches the
+        # counters and archive baselines as read. A join, payment or archive run that
+        # lands in between changes one of them, so the fix is skipped until next run.
+        expected = _expected_stats([user_doc["user_id"] for user_doc in batch])
+        fixes = []
+        for user_doc in batch:
+            archived = user_doc.get("archived", {})
+            want = {f: v + archived.get(f, 0) for f, v in expected[user_doc["user_id"]].items()}
+            drift = {f: v for f, v in want.items() if user_doc.get(f, 0) != v}
+            if not drift:
+                continue
+            observed = {"user_id": user_doc["user_id"]}
+            for field in drift:
+                observed[field] = _observed(user_doc.get(field, 0))
+                observed[f"archived.{field}"] = _observed(archived.get(field, 0))
+            fixes.append(UpdateOne(observed, {"$set": drift}))
+
+        if fixes:
+            fixed += db.users.bulk_write(fixes, ordered=False).modified_count
+
+    if fixed:
+        print(f"Reconciled stats for {fixed} users")
+    return fixed
+
+
 def has_paid_for_tournament(user_id, tournament_id):
     payment = db.payments.find_one({
         "user_id": user_id,
@@ -233,8 +1114,135 @@ def has_paid_for_tournament(user_id, tournament_id):
     return payment is not None
 
 
-def get_pending_payments():
-    return list(db.payments.find({"status": "pending"}))
+PENDING_PAYMENT_INDEX = [("status", 1), ("created_at", 1)]
+PENDING_PAYMENT_PROJECTION = {"_id": 0, "user_id": 1, "tournament_id": 1, "amount": 1, "utr": 1, "created_at": 1}
+STALE_DIGEST_LIMIT = 20
+
+
+def get_pending_payments(limit=100):
+    """Oldest pending payments first, at most `limit`"""
+    return list(db.payments.find({"status": "pending"}).sort("created_at", 1).hint(PENDING_PAYMENT_INDEX).limit(limit))
+
+
+def iter_pending_payments(batch_size=500):
+    """Cursor over pending payments, oldest first, read in batches via the (status, created_at) index"""
+    return db.payments.find(
+        {"status": "pending"}, PENDING_PAYMENT_PROJECTION
+    ).sort("created_at", 1).hint(PENDING_PAYMENT_INDEX).batch_size(batch_size)
+
+
+def _tournament_started(tournament, now):
+    """Deleted, live or completed tournaments count as started, as do upcoming ones past their slot"""
+    if not tournament or tournament.get("status") in ("live", "completed"):
+        return True
+    start = scheduled_at(tournament)
+    return start is not None and start <= now
+
+
+def _expire_payments(payments, now):
+    """Move pending payments to expired; returns those this call flipped"""
+    db.payments.bulk_write([
+        UpdateOne(
+            {"user_id": p["user_id"], "tournament_id": p["tournament_id"], "status": "pending"},
+            {"$set": {"status": "expired", "expired_at": now, "updated_at": now}}
+        )
+        for p in payments
+    ], ordered=False)
+
+    # expired_at is unique to this call, so a payment confirmed meanwhile isn't reported
+    flipped = {
+        (p["user_id"], p["tournament_id"])
+        for p in db.payments.find(
+            {"status": "expired", "expired_at": now, "user_id": {"$in": [p["user_id"] for p in payments]}},
+            {"_id": 0, "user_id": 1, "tournament_id": 1}
+        )
+    }
+    expired = [p for p in payments if (p["user_id"], p["tournament_id"]) in flipped]
+    if not expired:
+        return []
+
+    db.users.bulk_write([
+        UpdateOne(
+            {"user_id": p["user_id"], "payments.tournament_id": p["tournament_id"]},
+            {"$set": {"payments.$.status": "expired", "payments.$.expired_at": now}}
+        )
+        for p in expired
+    ], ordered=False)
+
+    _bump_dashboard(pending_payments=-len(expired))
+    for p in expired:
+        log_event("payment_expired", user_id=p["user_id"], tournament_id=p["tournament_id"], amount=p["amount"])
+    return expired
+
+
+def sweep_pending_payments(stale_hours, batch_size=500):
+    """Expire pending payments for tournaments that have started and collect the stale rest
+
+    Returns {"expired": [...], "stale": [oldest few], "stale_count": n}; expired
+    entries carry the tournament name for user notifications.
+    """
+    now = datetime.now(timezone.utc)
+    stale_before = now - timedelta(hours=stale_hours)
+
+    tournaments = {}
+    batch = []
+    expired = []
+    stale = []
+    stale_count = 0
+
+    for payment in iter_pending_payments(batch_size):
+        tournament_id = payment["tournament_id"]
+        if tournament_id not in tournaments:
+            tournaments[tournament_id] = db.tournaments.find_one(
+                {"tournament_id": tournament_id},
+                {"_id": 0, "name": 1, "status": 1, "date": 1, "time": 1}
+            )
+        tournament = tournaments[tournament_id]
+
+        if _tournament_started(tournament, now):
+            payment["tournament_name"] = (tournament or {}).get("name", tournament_id)
+            batch.append(payment)
+            if len(batch) >= batch_size:
+                expired.extend(_expire_payments(batch, now))
+                batch = []
+        elif payment["created_at"].replace(tzinfo=timezone.utc) < stale_before:
+            stale_count += 1
+            if len(stale) < STALE_DIGEST_LIMIT:
+                stale.append(payment)
+
+    if batch:
+        expired.extend(_expire_payments(batch, now))
+
+    return {"expired": expired, "stale": stale, "stale_count": stale_count}
+
+
+def load_payment(user_id, tournament_id, fields=None):
+    """Get a Payment model for a user's tournament entry"""
+    return Payment.from_doc(db.payments.find_one(
+        {"user_id": user_id, "tournament_id": tournament_id},
+        Payment.projection(fields)
+    ))
+
+
+PAYMENT_EXPORT_FIELDS = ["created_at", "user_id", "tournament_id", "amount", "utr", "status", "confirmed_at"]
+PLAYER_EXPORT_FIELDS = ["user_id", "username", "first_name", "paid"]
+
+
+def iter_payments(start, end, batch_size=1000):
+    """Cursor over payments created in [start, end), read in batches via the created_at index"""
+    projection = {"_id": 0, **{field: 1 for field in PAYMENT_EXPORT_FIELDS}}
+    return db.payments.find(
+        {"created_at": {"$gte": start, "$lt": end}},
+        projection
+    ).sort("created_at", 1).hint([("created_at", 1)]).batch_size(batch_size)
+
+
+def iter_tournament_players(tournament_id, batch_size=1000):
+    """Cursor over a tournament's enrolments"""
+    projection = {"_id": 0, **{field: 1 for field in PLAYER_EXPORT_FIELDS}}
+    return db.enrolments.find(
+        {"tournament_id": tournament_id}, projection
+    ).sort("joined_at", 1).batch_size(batch_size)
 
 
 def get_financial_data(period="today"):
@@ -246,6 +1254,8 @@ def get_financial_data(period="today"):
         start_date = today - timedelta(days=7)
     elif period == "monthly":
         start_date = today.replace(day=1)
+    elif period == "all":
+        start_date = datetime(1970, 1, 1, tzinfo=timezone.utc)
     else:
         start_date = today
 
@@ -274,6 +1284,589 @@ def get_financial_data(period="today"):
         return {"total_revenue": 0, "total_transactions": 0, "unique_users": 0}
 
 
+# === Channel outbox ===
+
+OUTBOX_MAX_ATTEMPTS = 8
+OUTBOX_LEASE_SECONDS = 60
+
+
+def enqueue_outbox(chat_id, text, reply_markup=None, parse_mode=None, tournament_id=None, session=None):
+    """Queue a message for background delivery; reply_markup is a plain Bot API dict"""
+    now = datetime.now(timezone.utc)
+    message = {
+        "chat_id": chat_id,
+        "text": text,
+        "reply_markup": reply_markup,
+        "parse_mode": parse_mode,
+        "tournament_id": tournament_id,
+        "status": "pending",
+        "attempts": 0,
+        "next_attempt_at": now,
+        "created_at": now
+    }
+    db.outbox.insert_one(message, session=session)
+    return message
+
+
+def claim_outbox_message():
+    """Lease the next due message so no other worker sends it concurrently"""
+    now = datetime.now(timezone.utc)
+    return db.outbox.find_one_and_update(
+        {"status": "pending", "next_attempt_at": {"$lte": now}},
+        {
+            "$set": {"next_attempt_at": now + timedelta(seconds=OUTBOX_LEASE_SECONDS)},
+            "$inc": {"attempts": 1}
+        },
+        sort=[("next_attempt_at", 1)],
+        return_document=ReturnDocument.AFTER
+    )
+
+
+def mark_outbox_sent(message, message_id):
+    """Record delivery and remember the channel message on its tournament"""
+    db.outbox.update_one(
+        {"_id": message["_id"]},
+        {"$set": {"status": "sent", "message_id": message_id, "sent_at": datetime.now(timezone.utc)}}
+    )
+    if message.get("tournament_id"):
+        db.tournaments.update_one(
+            {"tournament_id": message["tournament_id"]},
+            {"$set": {"channel_message_id": message_id, "channel_chat_id": message["chat_id"]}}
+        )
+
+
+def mark_outbox_failed(message, error, retry_after=None):
+    """Schedule a retry with exponential backoff, giving up after OUTBOX_MAX_ATTEMPTS"""
+    if message["attempts"] >= OUTBOX_MAX_ATTEMPTS:
+        update = {"status": "failed", "last_error": str(error)}
+    else:
+        delay = retry_after or min(5 * 2 ** message["attempts"], 900)
+        update = {
+            "next_attempt_at": datetime.now(timezone.utc) + timedelta(seconds=delay),
+            "last_error": str(error)
+        }
+    db.outbox.update_one({"_id": message["_id"]}, {"$set": update})
+
+
+# === Activity histogram ===
+
+# Counters per IST hour of the week (0 = Monday 00:00): distinct active users
+# and tournament joins. Updates only touch memory; flush_activity $incs the
+# activity collection, so the histogram is never rebuilt by rescanning.
+IST = timezone(timedelta(hours=5, minutes=30))
+HOURS_PER_WEEK = 7 * 24
+_pending_activity = {}
+_active_hour = None
+_active_users = set()
+
+
+def hour_of_week(when=None):
+    when = (when or datetime.now(timezone.utc)).astimezone(IST)
+    return when.weekday() * 24 + when.hour
+
+
+def note_activity(user_id, kind="users"):
+    """Count a user once per IST hour slot (kind="users"), or count a join (kind="joins")"""
+    global _active_hour
+    now = datetime.now(timezone.utc)
+    slot = hour_of_week(now)
+
+    if kind == "users":
+        # Reset on the same IST hour the counts are bucketed by, not the UTC hour
+        hour = (now.astimezone(IST).date(), slot)
+        if hour != _active_hour:
+            _active_hour = hour
+            _active_users.clear()
+        if user_id in _active_users:
+            return
+        _active_users.add(user_id)
+
+    counts = _pending_activity.setdefault(slot, {})
+    counts[kind] = counts.get(kind, 0) + 1
+
+
+def flush_activity():
+    """Add buffered activity counts to the stored histogram"""
+    global _pending_activity
+    if not _pending_activity:
+        return 0
+
+    pending, _pending_activity = _pending_activity, {}
+    try:
+        db.activity.bulk_write([
+            UpdateOne({"_id": slot}, {"$inc": counts}, upsert=True)
+            for slot, counts in pending.items()
+        ], ordered=False)
+    except Exception:
+        for slot, counts in pending.items():
+            merged = _pending_activity.setdefault(slot, {})
+            for kind, n in counts.items():
+                merged[kind] = merged.get(kind, 0) + n
+        raise
+    return len(pending)
+
+
+def get_activity_histogram():
+    """168 hour-of-week buckets of {"users": n, "joins": n}"""
+    histogram = [{"users": 0, "joins": 0} for _ in range(HOURS_PER_WEEK)]
+    for doc in db.activity.find({}):
+        histogram[doc["_id"]]["users"] = doc.get("users", 0)
+        histogram[doc["_id"]]["joins"] = doc.get("joins", 0)
+    return histogram
+
+
+def seed_activity():
+    """Build the join histogram from existing enrolment timestamps (first run only)"""
+    if db.activity.estimated_document_count() > 0:
+        return 0
+
+    rows = list(db.enrolments.aggregate([
+        {"$match": {"joined_at": {"$type": "date"}}},
+        {"$group": {
+            "_id": {"$add": [
+                {"$multiply": [{"$subtract": [{"$isoDayOfWeek": {"date": "$joined_at", "timezone": "+05:30"}}, 1]}, 24]},
+                {"$hour": {"date": "$joined_at", "timezone": "+05:30"}}
+            ]},
+            "joins": {"$sum": 1}
+        }}
+    ]))
+    if rows:
+        db.activity.bulk_write([
+            UpdateOne({"_id": row["_id"]}, {"$inc": {"joins": row["joins"]}}, upsert=True)
+            for row in rows
+        ], ordered=False)
+    return len(rows)
+
+
+# === Broadcasts ===
+
+BROADCAST_CHECKPOINT_EVERY = 20
+
+
+def create_broadcast(text, user_ids, parse_mode=None, label=None, report_chat_id=None):
+    """Record a direct-message broadcast so it can resume after a restart"""
+    broadcast = {
+        "text": text,
+        "parse_mode": parse_mode,
+        "label": label,
+        "report_chat_id": report_chat_id,
+        "recipients": list(user_ids),
+        "position": 0,
+        "delivered": 0,
+        "status": "running",
+        "created_at": datetime.now(timezone.utc)
+    }
+    broadcast["_id"] = db.broadcasts.insert_one(broadcast).inserted_id
+    return broadcast
+
+
+def save_broadcast_progress(broadcast_id, position, delivered, finished=False):
+    """Checkpoint how far a broadcast got; recipients before position are done"""
+    update = {"position": position, "delivered": delivered}
+    if finished:
+        update["status"] = "finished"
+        update["finished_at"] = datetime.now(timezone.utc)
+    db.broadcasts.update_one({"_id": broadcast_id}, {"$set": update})
+
+
+def get_unfinished_broadcasts():
+    return list(db.broadcasts.find({"status": "running"}).sort("created_at", 1))
+
+
+# === Bot state ===
+
+# Highest update_id whose handlers have finished; persisted so a restart
+# can skip updates Telegram redelivers after an unclean stop
+_last_update_id = 0
+_saved_update_id = 0
+
+
+def load_last_update_id():
+    global _last_update_id, _saved_update_id
+    state = db.bot_state.find_one({"_id": "updates"}) or {}
+    _last_update_id = _saved_update_id = state.get("last_update_id", 0)
+    return _last_update_id
+
+
+# Telegram restarts update_ids at a random value after a week without updates,
+# so only IDs just below the saved offset count as redelivered
+REDELIVERY_WINDOW = 10000
+
+
+def is_update_processed(update_id):
+    return _last_update_id - REDELIVERY_WINDOW < update_id <= _last_update_id
+
+
+def note_update_processed(update_id):
+    global _last_update_id
+    if not is_update_processed(update_id):
+        _last_update_id = update_id
+
+
+def flush_last_update_id():
+    """Persist the processed-update offset if it moved"""
+    global _saved_update_id
+    update_id = _last_update_id
+    if update_id == _saved_update_id:
+        return 0
+    db.bot_state.update_one(
+        {"_id": "updates"},
+        {"$set": {"last_update_id": update_id}},
+        upsert=True
+    )
+    _saved_update_id = update_id
+    return update_id
+
+
+# === Event log ===
+
+# Events are buffered in memory and written in batches by flush_events, so
+# instrumented handlers only pay for a list append. Each month gets its own
+# collection (events_YYYY_MM); old months can be archived or dropped whole.
+_event_buffer = []
+_indexed_event_collections = set()
+
+
+def _event_collection(ts):
+    name = f"events_{ts.year:04d}_{ts.month:02d}"
+    collection = db[name]
+    if name not in _indexed_event_collections:
+        collection.create_index([("u", 1), ("t", -1)])
+        collection.create_index([("tn", 1), ("t", -1)])
+        _indexed_event_collections.add(name)
+    return collection
+
+
+def log_event(event, user_id=None, tournament_id=None, actor=None, **data):
+    """Append an event to the write buffer (compact keys: t, e, u, tn, a, d)"""
+    doc = {"t": datetime.now(timezone.utc), "e": event}
+    if user_id is not None:
+        doc["u"] = user_id
+    if tournament_id is not None:
+        doc["tn"] = tournament_id
+    if actor is not None:
+        doc["a"] = actor
+    data = {k: v for k, v in data.items() if v is not None}
+    if data:
+        doc["d"] = data
+    _event_buffer.append(doc)
+
+
+def flush_events():
+    """Insert buffered events into their monthly collections; returns the number written"""
+    global _event_buffer
+    if not _event_buffer:
+        return 0
+
+    pending, _event_buffer = _event_buffer, []
+    by_month = {}
+    for doc in pending:
+        by_month.setdefault((doc["t"].year, doc["t"].month), []).append(doc)
+
+    remaining = list(by_month.values())
+    written = 0
+    try:
+        while remaining:
+            docs = remaining[0]
+            try:
+                _event_collection(docs[0]["t"]).insert_many(docs, ordered=False)
+            except BulkWriteError as e:
+                # A retried batch collides with the events it already wrote; anything else is real
+                if any(error["code"] != 11000 for error in e.details["writeErrors"]):
+                    raise
+            written += len(docs)
+            remaining.pop(0)
+    except Exception:
+        # Put back anything not yet written so the next flush retries it
+        _event_buffer = [doc for docs in remaining for doc in docs] + _event_buffer
+        raise
+
+    return written
+
+
+def get_user_timeline(user_id, limit=30, months=6):
+    """Most recent events for a user across the last few monthly collections, newest first"""
+    now = datetime.now(timezone.utc)
+    year, month = now.year, now.month
+    existing = set(db.list_collection_names(filter={"name": {"$regex": "^events_"}}))
+    events = []
+
+    for _ in range(months):
+        name = f"events_{year:04d}_{month:02d}"
+        if name in existing:
+            events.extend(db[name].find(
+                {"u": user_id},
+                {"_id": 0}
+            ).sort("t", -1).limit(limit - len(events)))
+            if len(events) >= limit:
+                break
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+
+    return events
+
+
+# === Dashboard snapshot ===
+# Counters behind /dashboard and the admin /start. Writes below adjust them in
+# memory as they happen; refresh_dashboard_snapshot recomputes everything from
+# Mongo every DASHBOARD_REFRESH_SECONDS, correcting any drift.
+ACTIVE_USER_WINDOW = 300
+_dashboard = {
+    "live": 0, "upcoming": 0, "pending_payments": 0, "revenue_today": 0,
+    "revenue_day": None, "next_drop": None, "refreshed_at": None
+}
+_upcoming_drops = {}          # tournament_id -> (scheduled_at or None, name)
+_live_ids = set()
+_last_seen = OrderedDict()    # user_id -> monotonic time, oldest first
+
+
+def _next_drop(drops):
+    now = datetime.now(IST)
+    due = [(when, tid, name) for tid, (when, name) in drops.items() if when and when >= now]
+    if not due:
+        return None
+    when, tid, name = min(due)
+    return {"tournament_id": tid, "name": name, "when": when.strftime("%Y-%m-%d %H:%M")}
+
+
+def _bump_dashboard(**deltas):
+    for key, delta in deltas.items():
+        _dashboard[key] = max(0, _dashboard[key] + delta)
+
+
+def _note_revenue(amount):
+    day = datetime.now(timezone.utc).date()
+    if _dashboard["revenue_day"] != day:
+        _dashboard["revenue_day"] = day
+        _dashboard["revenue_today"] = 0
+    _dashboard["revenue_today"] += amount
+
+
+def _note_tournament_status(tournament_id, status, tournament=None):
+    """Track a tournament that was created (tournament given), changed status or was deleted (status None)"""
+    if status == "upcoming" and tournament is None:
+        return
+    _upcoming_drops.pop(tournament_id, None)
+    _live_ids.discard(tournament_id)
+    if status == "upcoming":
+        _upcoming_drops[tournament_id] = (scheduled_at(tournament), tournament.get("name"))
+    elif status == "live":
+        _live_ids.add(tournament_id)
+    _dashboard.update(
+        upcoming=len(_upcoming_drops), live=len(_live_ids), next_drop=_next_drop(_upcoming_drops)
+    )
+
+
+def note_user_seen(user_id):
+    """Record that a user just sent an update"""
+    now = time.monotonic()
+    _last_seen[user_id] = now
+    _last_seen.move_to_end(user_id)
+    while _last_seen:
+        oldest_id, seen_at = next(iter(_last_seen.items()))
+        if now - seen_at <= ACTIVE_USER_WINDOW:
+            break
+        del _last_seen[oldest_id]
+
+
+def refresh_dashboard_snapshot():
+    """Recompute the dashboard counters from Mongo"""
+    global _upcoming_drops, _live_ids
+    drops = {}
+    live = set()
+    for t in db.tournaments.find(
+        {"status": {"$in": ["upcoming", "live"]}},
+        {"_id": 0, "tournament_id": 1, "name": 1, "status": 1, "date": 1, "time": 1}
+    ):
+        if t["status"] == "upcoming":
+            drops[t["tournament_id"]] = (scheduled_at(t), t.get("name"))
+        else:
+            live.add(t["tournament_id"])
+
+    now = datetime.now(timezone.utc)
+    _upcoming_drops, _live_ids = drops, live
+    _dashboard.update({
+        "upcoming": len(drops),
+        "live": len(live),
+        "pending_payments": db.payments.count_documents({"status": "pending"}),
+        "revenue_today": get_financial_data("today")["total_revenue"],
+        "revenue_day": now.date(),
+        "next_drop": _next_drop(drops),
+        "refreshed_at": now
+    })
+
+
+def get_dashboard_snapshot():
+    """Current dashboard counters; no database access"""
+    cutoff = time.monotonic() - ACTIVE_USER_WINDOW
+    active = len(_last_seen)
+    # Users seen since the last prune may have aged out; the dict is ordered oldest first
+    for seen_at in _last_seen.values():
+        if seen_at > cutoff:
+            break
+        active -= 1
+    return {**_dashboard, "active_users": active}
+
+
+# === Lifecycle and archive ===
+# Finished tournaments are marked completed; after ARCHIVE_AFTER_DAYS they and
+# old payments move to *_archive collections in small batches. Monthly rollups
+# keep the totals, so lifetime figures survive the move.
+
+
+def _month_key(when):
+    return when.strftime("%Y-%m")
+
+
+def complete_finished_tournaments(duration_hours):
+    """Mark tournaments completed once their slot plus duration_hours has passed; returns their IDs"""
+    now = datetime.now(timezone.utc)
+    cutoff = now - timedelta(hours=duration_hours)
+    finished = []
+    for t in db.tournaments.find(
+        {"status": {"$in": ["upcoming", "live"]}},
+        {"_id": 0, "tournament_id": 1, "date": 1, "time": 1}
+    ):
+        start = scheduled_at(t)
+        if start is not None and start <= cutoff:
+            finished.append(t["tournament_id"])
+    if finished:
+        db.tournaments.update_many(
+            {"tournament_id": {"$in": finished}, "status": {"$in": ["upcoming", "live"]}},
+            {"$set": {"status": "completed", "completed_at": now}}
+        )
+        for tournament_id in finished:
+            _note_tournament_status(tournament_id, "completed")
+    return finished
+
+
+def _inc_rollups(rollups, session):
+    """$inc counters into rollup documents keyed by _id"""
+    if rollups:
+        db.rollups.bulk_write([
+            UpdateOne({"_id": key}, {"$inc": counts}, upsert=True)
+            for key, counts in rollups.items()
+        ], ordered=False, session=session)
+
+
+def _inc_archived_stats(per_user, field, session):
+    """Add archived contributions to users' archived.<field> baselines"""
+    if per_user:
+        db.users.bulk_write([
+            UpdateOne({"user_id": user_id}, {"$inc": {f"archived.{field}": amount}})
+            for user_id, amount in per_user.items()
+        ], ordered=False, session=session)
+
+
+def archive_tournaments(cutoff, batch_size=200):
+    """Move one batch of completed tournaments created before cutoff to tournaments_archive"""
+    batch = list(db.tournaments.find(
+        {"status": "completed", "created_at": {"$lt": cutoff}}
+    ).limit(batch_size))
+    if not batch:
+        return 0
+    tournament_ids = [t["tournament_id"] for t in batch]
+
+    def move(session):
+        result = db.tournaments_archive.bulk_write([
+            ReplaceOne({"tournament_id": t["tournament_id"]}, t, upsert=True) for t in batch
+        ], ordered=False, session=session)
+
+        # Only count tournaments archived for the first time, so a retried batch isn't rolled up twice
+        new_ids = [batch[i]["tournament_id"] for i in result.upserted_ids]
+        rollups = {}
+        for i in result.upserted_ids:
+            t = batch[i]
+            counts = rollups.setdefault(f"tournaments:{_month_key(t['created_at'])}:{t.get('type', 'unknown')}", {})
+            for field, amount in (
+                ("tournaments", 1),
+                ("participants", t.get("participant_count", 0)),
+                ("collected", t.get("total_collected", 0)),
+                (f"maps.{t.get('map', 'Unknown')}", 1)
+            ):
+                counts[field] = counts.get(field, 0) + amount
+        _inc_rollups(rollups, session)
+
+        # reconcile_user_stats adds these to what it counts in the live collections
+        played = db.enrolments.aggregate([
+            {"$match": {"tournament_id": {"$in": new_ids}}},
+            {"$group": {"_id": "$user_id", "count": {"$sum": 1}}}
+        ], session=session)
+        _inc_archived_stats({row["_id"]: row["count"] for row in played}, "tournaments_played", session)
+
+        db.enrolments.delete_many({"tournament_id": {"$in": tournament_ids}}, session=session)
+        db.waitlist.delete_many({"tournament_id": {"$in": tournament_ids}}, session=session)
+        db.tournaments.delete_many({"tournament_id": {"$in": tournament_ids}}, session=session)
+
+    run_transaction(move)
+    return len(batch)
+
+
+def archive_payments(cutoff, batch_size=500):
+    """Move one batch of settled payments created before cutoff to payments_archive"""
+    batch = list(db.payments.find(
+        {"created_at": {"$lt": cutoff}, "status": {"$ne": "pending"}}
+    ).sort("created_at", 1).hint([("created_at", 1)]).limit(batch_size))
+    if not batch:
+        return 0
+
+    by_user = {}
+    for p in batch:
+        by_user.setdefault(p["user_id"], []).append(p["tournament_id"])
+
+    def move(session):
+        result = db.payments_archive.bulk_write([
+            ReplaceOne({"_id": p["_id"]}, p, upsert=True) for p in batch
+        ], ordered=False, session=session)
+
+        rollups = {}
+        spent = {}
+        for i in result.upserted_ids:
+            p = batch[i]
+            counts = rollups.setdefault(f"payments:{_month_key(p['created_at'])}", {})
+            status_key = f"status.{p.get('status', 'unknown')}"
+            counts[status_key] = counts.get(status_key, 0) + 1
+            if p.get("status") == "confirmed":
+                counts["revenue"] = counts.get("revenue", 0) + p.get("amount", 0)
+                counts["transactions"] = counts.get("transactions", 0) + 1
+                spent[p["user_id"]] = spent.get(p["user_id"], 0) + p.get("amount", 0)
+        _inc_rollups(rollups, session)
+        _inc_archived_stats(spent, "total_spent", session)
+
+        # The per-user copy in users.payments goes too, keeping user documents small
+        db.users.bulk_write([
+            UpdateOne({"user_id": user_id}, {"$pull": {"payments": {"tournament_id": {"$in": tournament_ids}}}})
+            for user_id, tournament_ids in by_user.items()
+        ], ordered=False, session=session)
+        db.payments.delete_many({"_id": {"$in": [p["_id"] for p in batch]}}, session=session)
+
+    run_transaction(move)
+    return len(batch)
+
+
+def archive_old_records(older_than_days, batch_size=200, max_batches=50):
+    """Archive tournaments, then payments, older than older_than_days; returns (tournaments, payments) moved"""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+    moved = [0, 0]
+    for i, archive in enumerate((archive_tournaments, archive_payments)):
+        for _ in range(max_batches):
+            count = archive(cutoff, batch_size)
+            moved[i] += count
+            if count < batch_size:
+                break
+    return tuple(moved)
+
+
+def get_archived_revenue():
+    """Revenue and confirmed transactions from archived payments, summed over monthly rollups"""
+    result = list(db.rollups.aggregate([
+        {"$match": {"_id": {"$regex": "^payments:"}}},
+        {"$group": {"_id": None, "total_revenue": {"$sum": "$revenue"}, "total_transactions": {"$sum": "$transactions"}}}
+    ]))
+    if result:
+        return result[0]
+    return {"total_revenue": 0, "total_transactions": 0}
+
+
 # === Async stubs (not active unless using motor) ===
 
 async def save_payment(payment_data):
@@ -285,11 +1878,87 @@ async def get_payment(user_id):
 async def get_tournament_async(tournament_id):
     return db.tournaments.find_one({"tournament_id": tournament_id})
 
+# (collection, keys, options); each is built on its own so one failure doesn't skip the rest
+INDEXES = [
+    ("users", "user_id", {"unique": True}),
+    ("users", "username_lower", {"unique": True, "sparse": True}),
+    ("users", "referral_code", {"unique": True, "sparse": True}),
+    ("tournaments", "tournament_id", {"unique": True}),
+    ("tournaments", [("status", 1), ("created_at", 1)], {}),
+    ("tournaments_archive", "tournament_id", {"unique": True}),
+    ("tournaments_archive", [("type", 1), ("map", 1), ("status", 1)], {}),
+    ("payments_archive", [("user_id", 1), ("tournament_id", 1)], {}),
+    ("payments", [("user_id", 1), ("tournament_id", 1)], {"unique": True}),
+    ("payments", "created_at", {}),
+    ("payments", PENDING_PAYMENT_INDEX, {}),
+    ("referrals", "referrer_id", {}),
+    ("referrals", "referred_id", {"unique": True}),
+    ("match_results", [("tournament_id", 1), ("user_id", 1)], {"unique": True}),
+    ("match_results", "user_id", {}),
+    ("leaderboard", [("board", 1), ("user_id", 1)], {"unique": True}),
+    ("leaderboard", [("board", 1), ("score", -1), ("kills", -1), ("user_id", 1)], {}),
+    ("outbox", [("status", 1), ("next_attempt_at", 1)], {}),
+    ("waitlist", [("tournament_id", 1), ("user_id", 1)], {"unique": True}),
+    ("waitlist", [("tournament_id", 1), ("status", 1), ("joined_at", 1)], {}),
+    ("waitlist", [("status", 1), ("offer_expires_at", 1)], {}),
+    ("broadcasts", [("status", 1), ("created_at", 1)], {}),
+]
+
+
+def backfill_usernames():
+    """Fill username_lower and release duplicates so its unique index can be built
+
+    When several accounts share a username (case-insensitively) the most
+    recently joined one keeps it; the owner re-claims it on their next profile change.
+    """
+    db.users.update_many(
+        {"username": {"$type": "string"}, "username_lower": {"$exists": False}},
+        [{"$set": {"username_lower": {"$toLower": "$username"}}}]
+    )
+    released = 0
+    for duplicate in db.users.aggregate([
+        {"$match": {"username_lower": {"$type": "string"}}},
+        {"$sort": {"joined_at": -1}},
+        {"$group": {"_id": "$username_lower", "keep": {"$first": "$user_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}}
+    ]):
+        released += db.users.update_many(
+            {"username_lower": duplicate["_id"], "user_id": {"$ne": duplicate["keep"]}},
+            {"$unset": {"username_lower": ""}}
+        ).modified_count
+    return released
+
+
+def prepare_enrolments():
+    """Enrolment indexes and the participants migration; must finish before any join is accepted"""
+    db.enrolments.create_index([("tournament_id", 1), ("user_id", 1)], unique=True)
+    db.enrolments.create_index("user_id")
+    return migrate_participants()
+
+
 def init_database():
+    """Create indexes and backfill derived fields; safe to run on every start"""
+    failed = 0
     try:
-        client = MongoClient(MONGODB_URI)
-        db = client[DATABASE_NAME]
-        db.users.create_index("user_id", unique=True)
-        print("✅ Database initialized!")
+        backfill_usernames()
     except Exception as e:
-        print("❌ Error initializing database:", e)
+        failed += 1
+        print("❌ Username backfill failed:", e)
+
+    for collection, keys, options in INDEXES:
+        try:
+            db[collection].create_index(keys, **options)
+        except Exception as e:
+            failed += 1
+            print(f"❌ Index {collection}.{keys} failed:", e)
+
+    try:
+        seed_activity()
+    except Exception as e:
+        failed += 1
+        print("❌ Activity seeding failed:", e)
+
+    if failed:
+        print(f"⚠️ Database initialized with {failed} failed step(s)")
+    else:
+        print("✅ Database initialized!")
@@ -0,0 +1,44 @@
+"""
+Streaming admin exports for No Mercy Zone Bot
+"""
+
+import csv
+import gzip
+import io
+import json
+import tempfile
+from datetime import datetime
+
+
+def _format_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def write_export(rows, fields, fmt="csv"):
+    """Stream rows into a gzip-compressed temp file (CSV or JSON lines)
+
+    Rows are consumed one at a time from the cursor, so memory use stays flat
+    however many rows there are. Returns (file object rewound to the start, row count).
+    """
+    fileobj = tempfile.TemporaryFile()
+    count = 0
+
+    with gzip.GzipFile(fileobj=fileobj, mode="wb") as gz:
+        text = io.TextIOWrapper(gz, encoding="utf-8", newline="")
+        if fmt == "json":
+            for row in rows:
+                text.write(json.dumps({f: _format_value(row.get(f)) for f in fields}) + "\n")
+                count += 1
+        else:
+            writer = csv.writer(text)
+            writer.writerow(fields)
+            for row in rows:
+                writer.writerow([_format_value(row.get(f)) for f in fields])
+                count += 1
+        text.flush()
+        text.detach()
+
+    fileobj.seek(0)
+    return fileobj, count
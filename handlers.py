@@ -4,12 +4,53 @@ Fixed tournament-specific payment system
 """
 
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import ContextTypes
-from database import *
-from messages import *
+from telegram.ext import ApplicationHandlerStop, ContextTypes
+from database import (
+    JOIN_ALREADY, JOIN_CLOSED, JOIN_FULL, JOIN_OK,
+    create_payment_request, create_user, credit_referral, get_recent_entries,
+    get_dashboard_snapshot, get_user, get_user_stats, has_paid_for_tournament, is_banned,
+    is_update_processed, is_user_joined_tournament, join_tournament, join_tournament_with_free_entry,
+    join_waitlist, load_active_tournaments, load_tournament, load_user,
+    note_activity, note_update_processed, note_user_profile, note_user_seen, update_user
+)
+from messages import (
+    get_admin_dashboard_message, get_channel_join_message, get_help_message,
+    get_main_menu_message, get_rules_message, get_tournament_post,
+    get_welcome_message, get_whatsapp_status_template
+)
 from utils import check_channel_membership, format_currency, get_ist_time, validate_utr
 from config import ADMIN_ID, CHANNEL_URL, UPI_ID, ADMIN_USERNAME
-from admin_handlers import handle_tournament_creation_steps
+from channel_posts import mark_post_dirty
+from leaderboard import get_board, board_name
+
+async def skip_processed_updates(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Pre-handler: drop updates Telegram redelivers after an unclean restart"""
+    if is_update_processed(update.update_id):
+        raise ApplicationHandlerStop
+
+async def mark_update_processed(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Post-handler: record the update as handled once every other group has run"""
+    note_update_processed(update.update_id)
+
+async def reject_banned_users(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Pre-handler: stop every update from a banned user before any other work"""
+    user = update.effective_user
+    if not user or not is_banned(user.id):
+        return
+    
+    if update.callback_query:
+        await update.callback_query.answer("ðŸš« You are banned from using this bot!", show_alert=True)
+    elif update.message and update.message.text and update.message.text.startswith('/'):
+        await update.message.reply_text("ðŸš« You are banned from using this bot!")
+    raise ApplicationHandlerStop
+
+async def track_user_profile(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Pre-handler: keep stored username/first_name in sync with Telegram and count activity"""
+    user = update.effective_user
+    if user:
+        note_user_profile(user.id, user.username, user.first_name)
+        note_activity(user.id)
+        note_user_seen(user.id)
 
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /start command"""
@@ -30,26 +71,27 @@ Your domain awaits your orders! ðŸ’€"""
         await update.message.reply_text(admin_welcome)
         
         # Show admin dashboard
-        dashboard_msg = get_admin_dashboard_message()
+        dashboard_msg = get_admin_dashboard_message(get_dashboard_snapshot())
         await update.message.reply_text(dashboard_msg)
         return
     
-    # Check if user is banned
+    # Banned users are already stopped by reject_banned_users
     user_data = get_user(user.id)
-    if user_data and user_data.get("banned", False):
-        await update.message.reply_text("ðŸš« You are banned from using this bot!")
-        return
     
     # Create or get user
     if not user_data:
         user_data = create_user(user.id, user.username, user.first_name)
+        
+        # Deep link /start <referral_code> credits the referrer once per new user
+        if context.args:
+            await handle_referral(context, context.args[0], user)
     
     # Send welcome message
     welcome_msg = get_welcome_message(user.first_name)
     await update.message.reply_text(welcome_msg)
     
     # Check channel membership
-    is_member = check_channel_membership(context.bot, user.id)
+    is_member = await check_channel_membership(context.bot, user.id)
     
     if not is_member:
         # Show channel join button
@@ -68,6 +110,20 @@ Your domain awaits your orders! ðŸ’€"""
         # Show main menu
         await show_main_menu(update, context, user_data)
 
+async def handle_referral(context, code, user):
+    """Attribute a new user to the owner of a referral code"""
+    referrer_id = credit_referral(code, user.id)
+    if referrer_id is None:
+        return
+    
+    try:
+        await context.bot.send_message(
+            chat_id=referrer_id,
+            text=f"ðŸŽ‰ {user.first_name} ne aapke referral code se join kiya!\n\nðŸ†“ +1 FREE ENTRY credit ho gayi! ðŸ”¥"
+        )
+    except Exception as e:
+        print(f"Failed to notify referrer {referrer_id}: {e}")
+
 async def show_main_menu(update, context, user_data):
     """Show main menu to user"""
     menu_msg = get_main_menu_message(user_data["first_name"], user_data["referral_code"])
@@ -90,13 +146,22 @@ async def show_main_menu(update, context, user_data):
 async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle button callbacks"""
     query = update.callback_query
-    await query.answer()
+    if not query:
+        return
     
     user_id = update.effective_user.id
-    user_data = get_user(user_id)
+    user_data = load_user(user_id, ["user_id", "first_name", "referral_code"])
+    
+    # Channel buttons can be pressed by people who never started the bot;
+    # an alert avoids editing the message they pressed on
+    if not user_data:
+        await query.answer("âŒ User data not found! Pehle bot pe /start karo.", show_alert=True)
+        return
+    
+    await query.answer()
     
     if query.data == "check_membership":
-        is_member = check_channel_membership(context.bot, user_id)
+        is_member = await check_channel_membership(context.bot, user_id)
         if is_member:
             update_user(user_id, {"is_member": True})
             await show_main_menu(update, context, user_data)
@@ -131,7 +196,7 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
 3. When they join using your code, you get free entry!
 
 ðŸ”— Share Link:
-https://t.me/YourBotUsername?start={user_data['referral_code']}
+https://t.me/{context.bot.username}?start={user_data['referral_code']}
 
 ðŸ’° Benefits:
 â€¢ 1 referral = 1 free tournament entry
@@ -178,7 +243,7 @@ https://t.me/YourBotUsername?start={user_data['referral_code']}
 
 async def show_active_tournaments(update, context):
     """Show active tournaments"""
-    tournaments = get_active_tournaments()
+    tournaments = load_active_tournaments()
     
     if not tournaments:
         msg = "ðŸš« Koi active tournament nahi hai abhi!\n\nJaldi hi naya tournament aayega. Channel pe active raho! ðŸ”¥"
@@ -213,8 +278,8 @@ async def show_active_tournaments(update, context):
 async def handle_tournament_join(update, context, tournament_id):
     """Handle tournament join request - Fixed to check tournament-specific payment"""
     user_id = update.effective_user.id
-    user_data = get_user(user_id)
-    tournament = get_tournament(tournament_id)
+    user_data = load_user(user_id, ["user_id", "free_entries"])
+    tournament = load_tournament(tournament_id)
     
     if not tournament:
         msg = "âŒ Tournament nahi mila! Koi technical issue hai."
@@ -225,6 +290,16 @@ async def handle_tournament_join(update, context, tournament_id):
         )
         return
     
+    # Registrations close once the room is dropped
+    if tournament.get('status') != 'upcoming':
+        msg = f"âŒ {tournament['name']} ki registrations band ho chuki hain!\n\nAgla tournament jaldi aayega. Channel pe active raho! ðŸ”¥"
+        keyboard = [[InlineKeyboardButton("ðŸ”™ Back", callback_data="active_tournament")]]
+        await update.callback_query.edit_message_text(
+            msg,
+            reply_markup=InlineKeyboardMarkup(keyboard)
+        )
+        return
+    
     # Check if user has already joined this tournament
     if is_user_joined_tournament(user_id, tournament_id):
         msg = f"âœ… Aap already joined ho {tournament['name']} mein!\n\nRoom details milenge match time pe. Ready raho! ðŸ”¥"
@@ -242,11 +317,12 @@ async def handle_tournament_join(update, context, tournament_id):
         
         if free_entries > 0:
             # Use free entry
-            success = join_tournament_with_free_entry(user_id, tournament_id)
-            if success:
+            result = join_tournament_with_free_entry(user_id, tournament_id)
+            if result == JOIN_OK:
+                mark_post_dirty(tournament_id)
                 msg = f"âœ… Free entry use karke join ho gaye!\n\nðŸŽ® Tournament: {tournament['name']}\nðŸ’° Free entries remaining: {free_entries - 1}\n\nRoom details milenge match time pe! ðŸ”¥"
             else:
-                msg = "âŒ Technical issue! Admin se contact karo."
+                msg = get_join_failure_message(result, user_id, tournament)
         else:
             # Show payment required message
             msg = f"""ðŸ’° PAYMENT REQUIRED
@@ -276,11 +352,12 @@ Tournament join karne ke liye payment karo:
             return
     else:
         # User has paid, join tournament
-        success = join_tournament(user_id, tournament_id)
-        if success:
+        result = join_tournament(user_id, tournament_id)
+        if result == JOIN_OK:
+            mark_post_dirty(tournament_id)
             msg = f"âœ… Successfully joined {tournament['name']}!\n\nRoom details milenge match time pe. Ready raho! ðŸ”¥"
         else:
-            msg = "âŒ Tournament join nahi ho saka. Admin se contact karo."
+            msg = get_join_failure_message(result, user_id, tournament, paid=True)
     
     keyboard = [[InlineKeyboardButton("ðŸ”™ Back", callback_data="active_tournament")]]
     await update.callback_query.edit_message_text(
@@ -288,9 +365,25 @@ Tournament join karne ke liye payment karo:
         reply_markup=InlineKeyboardMarkup(keyboard)
     )
 
+def get_join_failure_message(result, user_id, tournament, paid=False):
+    """Explain a failed join; full tournaments put the user on the waitlist"""
+    if result == JOIN_FULL:
+        # Slots just ran out, so the post needs the new count too
+        mark_post_dirty(tournament['tournament_id'])
+        position = join_waitlist(tournament['tournament_id'], user_id)
+        msg = f"âŒ {tournament['name']} ke saare slots full ho gaye!\n\nAap waitlist mein ho - position #{position}. Slot khali hote hi notification milega! ðŸ”¥"
+        if paid:
+            msg += f"\n\nðŸ’° Aapka payment safe hai. Slot nahi mila to {ADMIN_USERNAME} refund karenge."
+        return msg
+    if result == JOIN_ALREADY:
+        return f"âœ… Aap already joined ho {tournament['name']} mein!\n\nRoom details milenge match time pe. Ready raho! ðŸ”¥"
+    if result == JOIN_CLOSED:
+        return f"âŒ {tournament['name']} ki registrations band ho chuki hain!"
+    return "âŒ Tournament join nahi ho saka. Admin se contact karo."
+
 async def show_payment_instructions(update, context, tournament_id):
     """Show detailed payment instructions for specific tournament"""
-    tournament = get_tournament(tournament_id)
+    tournament = load_tournament(tournament_id)
     
     if not tournament:
         await update.callback_query.edit_message_text("âŒ Tournament not found!")
@@ -328,26 +421,25 @@ Example: `/paid {tournament_id} 123456789012`
 async def show_match_history(update, context):
     """Show user's match history"""
     user_id = update.effective_user.id
-    user_data = get_user(user_id)
     
-    tournaments_joined = user_data.get("tournaments_joined", [])
-    tournament_payments = user_data.get("tournament_payments", {})
+    # Counters are maintained incrementally, so this is one small read however long the history is
+    user_data = get_user_stats(user_id) or {}
+    recent_tournaments = user_data.get("tournaments_joined", [])
     
-    if not tournaments_joined:
+    if not recent_tournaments:
         msg = "ðŸ“œ Abhi tak koi tournament join nahi kiya!\n\nPehla tournament join karo aur history banao! ðŸŽ®"
     else:
         msg = f"ðŸ“œ *YOUR TOURNAMENT HISTORY*\n\n"
-        msg += f"ðŸŽ® Total Tournaments: {len(tournaments_joined)}\n"
+        msg += f"ðŸŽ® Total Tournaments: {user_data.get('tournaments_played', 0)}\n"
         msg += f"ðŸ’° Total Spent: {format_currency(user_data.get('total_spent', 0))}\n"
         msg += f"ðŸ† Total Earned: {format_currency(user_data.get('total_earned', 0))}\n"
+        msg += f"ðŸ¥‡ Wins: {user_data.get('wins', 0)} | ðŸ’€ Kills: {user_data.get('kills', 0)}\n"
         msg += f"ðŸ†“ Free Entries: {user_data.get('free_entries', 0)}\n\n"
         
-        msg += "ðŸ’³ *PAYMENT STATUS BY TOURNAMENT:*\n"
-        for tournament_id in tournaments_joined:
-            tournament = get_tournament(tournament_id)
-            if tournament:
-                payment_status = "âœ… Paid" if tournament_id in tournament_payments else "ðŸ†“ Free Entry"
-                msg += f"â€¢ {tournament['name']}: {payment_status}\n"
+        msg += "ðŸ’³ *RECENT TOURNAMENTS:*\n"
+        for name, paid in get_recent_entries(user_id, recent_tournaments):
+            payment_status = "âœ… Paid" if paid else "ðŸ†“ Free Entry"
+            msg += f"â€¢ {name}: {payment_status}\n"
     
     keyboard = [[InlineKeyboardButton("ðŸ”™ Back to Menu", callback_data="back_to_menu")]]
     await update.callback_query.edit_message_text(
@@ -375,7 +467,7 @@ async def paid_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     utr = context.args[1]
     
     # Validate tournament exists
-    tournament = get_tournament(tournament_id)
+    tournament = load_tournament(tournament_id)
     if not tournament:
         await update.message.reply_text(
             f"âŒ Invalid tournament ID: {tournament_id}\n\nActive tournaments check karo aur sahi ID use karo."
@@ -395,13 +487,37 @@ async def paid_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
     
+    # Closed tournaments can't give this payment a slot
+    if tournament.get('status') != 'upcoming':
+        await update.message.reply_text(
+            f"âŒ {tournament['name']} ki registrations band ho chuki hain!\n\nPayment kar diya hai to {ADMIN_USERNAME} ko UTR ke saath message karo, refund milega."
+        )
+        return
+    
+    # Full tournaments still record the payment, but the user goes on the waitlist
+    # and the admin is told it may need a refund
+    taken = tournament.get('participant_count', 0) + tournament.get('held_slots', 0)
+    is_full = taken >= tournament.get('max_slots', 100) and not is_user_joined_tournament(user_id, tournament_id)
+    
     # Create tournament-specific payment request
-    user_data = get_user(user_id)
+    user_data = load_user(user_id, ["user_id", "username", "first_name"])
     
     # Store pending payment request
-    create_payment_request(user_id, tournament_id, utr, tournament.get('entry_fee', 50))
+    create_payment_request(user_id, tournament_id, tournament.get('entry_fee', 50), utr)
     
-    msg = f"""âœ… Payment request submitted!
+    if is_full:
+        position = join_waitlist(tournament_id, user_id)
+        msg = f"""âš ï¸ Payment request recorded, lekin {tournament['name']} abhi FULL hai!
+
+ðŸŽ® Tournament: {tournament['name']}
+ðŸ’µ Amount: {format_currency(tournament.get('entry_fee', 50))}
+ðŸ§¾ UTR: `{utr}`
+ðŸ“‹ Waitlist position: #{position}
+
+Slot khali hua to notification milega.
+Slot nahi mila to {ADMIN_USERNAME} refund karenge."""
+    else:
+        msg = f"""âœ… Payment request submitted!
 
 ðŸŽ® Tournament: {tournament['name']}
 ðŸ’µ Amount: {format_currency(tournament.get('entry_fee', 50))}
@@ -416,7 +532,8 @@ Notification milega confirmation ke baad! ðŸ”¥
     await update.message.reply_text(msg, parse_mode='Markdown')
     
     # Forward to admin
-    admin_msg = f"""ðŸ’° *TOURNAMENT PAYMENT VERIFICATION REQUEST*
+    full_warning = "âš ï¸ *TOURNAMENT FULL* - user waitlisted; slot na mile to refund karo\n\n" if is_full else ""
+    admin_msg = f"""{full_warning}ðŸ’° *TOURNAMENT PAYMENT VERIFICATION REQUEST*
 
 ðŸ‘¤ User: {user_data.get('first_name', 'Unknown')} (@{user_data.get('username', 'no_username')})
 ðŸ†” User ID: `{user_id}`
@@ -439,36 +556,48 @@ async def match_history_command(update: Update, context: ContextTypes.DEFAULT_TY
     """Handle /matchhistory command"""
     await show_match_history(update, context)
 
+async def leaderboard_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /leaderboard [weekly|solo|duo|squad]"""
+    user_id = update.effective_user.id
+    kind = context.args[0].lower() if context.args else "global"
+    board = get_board(board_name(kind))
+    
+    titles = {"weekly": "THIS WEEK", "solo": "SOLO", "duo": "DUO", "squad": "SQUAD"}
+    msg = f"ðŸ† LEADERBOARD - {titles.get(kind, 'ALL TIME')}\n\n"
+    
+    top = board.top()
+    if not top:
+        msg += "Abhi tak koi result nahi aaya! Pehla winner bano! ðŸ”¥\n"
+    
+    medals = {1: "ðŸ¥‡", 2: "ðŸ¥ˆ", 3: "ðŸ¥‰"}
+    for rank, (_, score, kills, name) in enumerate(top, 1):
+        msg += f"{medals.get(rank, f'#{rank}')} {name or 'Player'} - â‚¹{score} ({kills} kills)\n"
+    
+    my_rank = board.rank(user_id)
+    if my_rank:
+        msg += f"\nðŸ“Š Your Rank: #{my_rank} of {len(board)} (â‚¹{board.score(user_id)})"
+    
+    msg += "\n\nUse: /leaderboard weekly | solo | duo | squad"
+    await update.message.reply_text(msg)
+
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /help command"""
     help_msg = get_help_message()
     await update.message.reply_text(help_msg, parse_mode='Markdown')
 
-async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    query = update.callback_query
-    if not query:  # Added null check
-        return
-        
-    await query.answer()
-    
-    user_id = update.effective_user.id
-    user_data = get_user(user_id)
-    
-    if not user_data:  # Added user data validation
-        await query.edit_message_text("âŒ User data not found! Please use /start command.")
-        return
-
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle regular text messages"""
     user_id = update.effective_user.id
     
     # Check if admin is in tournament creation process
     if str(user_id) == str(ADMIN_ID):
+        # Admin code is only loaded once the admin actually uses it
+        from admin_handlers import handle_tournament_creation_steps
         if await handle_tournament_creation_steps(update, context):
             return
     
     # Check if user is trying to interact without joining channel
-    is_member = check_channel_membership(context.bot, user_id)
+    is_member = await check_channel_membership(context.bot, user_id)
     
     if not is_member:
         msg = "âŒ Pehle channel join karo!\n\n/start command use karo."
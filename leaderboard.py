@@ -0,0 +1,111 @@
+"""
+Leaderboards for No Mercy Zone Bot
+"""
+
+from bisect import bisect_left, insort
+from datetime import datetime, timezone
+from database import update_leaderboards, get_leaderboard_entries
+
+TOP_PAGE_SIZE = 10
+
+
+class RankedIndex:
+    """Players ordered by (score desc, kills desc, user_id); rank lookups are a binary search"""
+
+    def __init__(self):
+        self._keys = []
+        self._entries = {}
+        self._top_page = None
+
+    def update(self, user_id, score, kills, name):
+        previous = self._entries.get(user_id)
+        if previous:
+            del self._keys[bisect_left(self._keys, previous[0])]
+
+        key = (-score, -kills, user_id)
+        insort(self._keys, key)
+        self._entries[user_id] = (key, name)
+        self._top_page = None
+
+    def add(self, user_id, score, kills, name):
+        """Add on top of the player's current totals"""
+        previous = self._entries.get(user_id)
+        if previous:
+            score -= previous[0][0]
+            kills -= previous[0][1]
+            name = name or previous[1]
+        self.update(user_id, score, kills, name)
+
+    def rank(self, user_id):
+        """1-based rank, or None if the player isn't on the board"""
+        entry = self._entries.get(user_id)
+        if not entry:
+            return None
+        return bisect_left(self._keys, entry[0]) + 1
+
+    def score(self, user_id):
+        entry = self._entries.get(user_id)
+        return -entry[0][0] if entry else 0
+
+    def top(self, n=TOP_PAGE_SIZE):
+        """Cached list of (user_id, score, kills, name) for the first n players"""
+        if self._top_page is None or len(self._top_page) != min(n, len(self._keys)):
+            self._top_page = [
+                (key[2], -key[0], -key[1], self._entries[key[2]][1]) for key in self._keys[:n]
+            ]
+        return self._top_page
+
+    def __len__(self):
+        return len(self._keys)
+
+
+_boards = {}
+
+
+def weekly_board(now=None):
+    year, week, _ = (now or datetime.now(timezone.utc)).isocalendar()
+    return f"weekly:{year}-W{week:02d}"
+
+
+def board_name(kind):
+    """Map /leaderboard argument to a board key: global, weekly, solo, duo or squad"""
+    if kind == "weekly":
+        return weekly_board()
+    if kind in ("solo", "duo", "squad"):
+        return f"mode:{kind}"
+    return "global"
+
+
+def get_board(board):
+    """Get a board's in-memory index, loading it from Mongo on first use"""
+    index = _boards.get(board)
+    if index is None:
+        index = RankedIndex()
+        for entry in get_leaderboard_entries(board):
+            index.update(entry["user_id"], entry.get("score", 0), entry.get("kills", 0), entry.get("name"))
+        _boards[board] = index
+
+        # Drop last week's board once a new week starts
+        for stale in [b for b in _boards if b.startswith("weekly:") and b != weekly_board()]:
+            del _boards[stale]
+    return index
+
+
+def load_boards():
+    """Rebuild the boards players look at most, at startup"""
+    for board in ("global", weekly_board(), "mode:solo", "mode:duo", "mode:squad"):
+        get_board(board)
+
+
+def apply_results(tournament_type, results):
+    """Credit a match's prizes and kills to the global, weekly and mode boards"""
+    boards = ["global", weekly_board(), f"mode:{tournament_type}"]
+    names = {row["user_id"]: row.get("name") for row in results}
+
+    # Load before writing so a board read from Mongo doesn't already include this match
+    indexes = [get_board(board) for board in boards]
+    update_leaderboards(boards, results, names)
+
+    for index in indexes:
+        for row in results:
+            index.add(row["user_id"], row["prize"], row["kills"], names[row["user_id"]])
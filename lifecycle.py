@@ -0,0 +1,24 @@
+"""
+Tournament lifecycle and archival for No Mercy Zone Bot
+"""
+
+import asyncio
+from config import ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE, TOURNAMENT_DURATION_HOURS
+from database import archive_old_records, complete_finished_tournaments
+from channel_posts import mark_post_dirty
+
+
+async def complete_tournaments():
+    """Background job: close tournaments whose match is over and update their channel posts"""
+    finished = await asyncio.to_thread(complete_finished_tournaments, TOURNAMENT_DURATION_HOURS)
+    for tournament_id in finished:
+        mark_post_dirty(tournament_id)
+    return finished
+
+
+async def archive_records():
+    """Background job: move old tournaments and payments out of the live collections"""
+    tournaments, payments = await asyncio.to_thread(archive_old_records, ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE)
+    if tournaments or payments:
+        print(f"Archived {tournaments} tournaments and {payments} payments")
+    return tournaments, payments
@@ -4,13 +4,29 @@
 BGMI Tournament Management Bot with Payment Processing
 """
 
+import asyncio
+import importlib.util
 import logging
-import os
-from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, filters
-from config import *
-from handlers import *
-from admin_handlers import *
-from database import init_database
+from telegram.ext import Application
+from telegram.request import HTTPXRequest
+from config import (
+    BOT_TOKEN, DASHBOARD_REFRESH_SECONDS, PAYMENT_SWEEP_MINUTES, SHUTDOWN_GRACE_SECONDS, TELEGRAM_POOL_SIZE, TELEGRAM_POOL_TIMEOUT,
+    TELEGRAM_GET_UPDATES_POOL_SIZE, TELEGRAM_HTTP_VERSION
+)
+from database import (
+    init_database, prepare_enrolments, flush_user_profiles, flush_events,
+    reconcile_user_stats, reconcile_participant_counts, load_banned_users, watch_banned_users, stop_watching_bans,
+    load_last_update_id, flush_last_update_id, flush_activity, refresh_dashboard_snapshot
+)
+from registry import register_handlers
+from tasks import spawn, run_periodically, drain
+from outbox import run_outbox_dispatcher
+from channel_posts import run_post_editor, flush_dirty_posts
+from broadcast import resume_broadcasts
+from waitlist import sweep_waitlist_offers
+from payment_reminders import sweep_payments
+from lifecycle import complete_tournaments, archive_records
+from leaderboard import load_boards
 
 # Configure logging
 logging.basicConfig(
@@ -19,43 +35,76 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def build_request(pool_size):
+    """HTTPX client for the Bot API; HTTP/2 multiplexes sends when h2 is installed"""
+    http_version = TELEGRAM_HTTP_VERSION
+    if http_version == "2" and importlib.util.find_spec("h2") is None:
+        http_version = "1.1"
+    return HTTPXRequest(
+        connection_pool_size=pool_size,
+        pool_timeout=TELEGRAM_POOL_TIMEOUT,
+        http_version=http_version
+    )
+
+async def sync_banned_users():
+    """Keep the ban list in step with other instances; poll when change streams aren't available"""
+    if not await asyncio.to_thread(watch_banned_users):
+        await run_periodically(60, load_banned_users)
+
+async def on_startup(application):
+    """Start background jobs once the event loop is running"""
+    # Joins rely on the enrolments unique index and migrated counts, so this
+    # finishes before polling starts; it's a no-op on a migrated database
+    await asyncio.to_thread(prepare_enrolments)
+    # The remaining indexes already exist on a warm database, so this never blocks polling
+    spawn(asyncio.to_thread(init_database))
+    await asyncio.to_thread(load_banned_users)
+    await asyncio.to_thread(load_last_update_id)
+    await asyncio.to_thread(load_boards)
+    spawn(run_periodically(5, flush_user_profiles))
+    spawn(run_periodically(5, flush_last_update_id))
+    spawn(run_periodically(60, flush_activity))
+    spawn(asyncio.to_thread(refresh_dashboard_snapshot))
+    spawn(run_periodically(DASHBOARD_REFRESH_SECONDS, refresh_dashboard_snapshot))
+    spawn(run_periodically(2, flush_events))
+    spawn(run_outbox_dispatcher(application.bot))
+    spawn(run_post_editor(application.bot))
+    spawn(run_periodically(60, sweep_waitlist_offers, application.bot))
+    spawn(run_periodically(PAYMENT_SWEEP_MINUTES * 60, sweep_payments, application.bot))
+    spawn(run_periodically(300, complete_tournaments))
+    spawn(run_periodically(6 * 3600, archive_records))
+    spawn(run_periodically(6 * 3600, reconcile_user_stats))
+    spawn(run_periodically(3600, reconcile_participant_counts))
+    spawn(sync_banned_users())
+    await resume_broadcasts(application.bot)
+
+async def on_stop(application):
+    """Drain in-flight work and flush write-behind buffers once polling has stopped"""
+    stop_watching_bans()
+    await drain(SHUTDOWN_GRACE_SECONDS)
+    await flush_dirty_posts(application.bot)
+    
+    for flush in (flush_user_profiles, flush_events, flush_last_update_id, flush_activity):
+        try:
+            await asyncio.to_thread(flush)
+        except Exception as e:
+            print(f"Shutdown flush {flush.__name__} failed: {e}")
+    logger.info("🚫 No Mercy Bot stopped cleanly")
+
 def main():
     """Start the bot."""
-    # Initialize database
-    init_database()
-    
-    # Create the Application
-    application = Application.builder().token(BOT_TOKEN).build()
-    
-    # Register handlers
-    # Command handlers
-    application.add_handler(CommandHandler("start", start_command))
-    application.add_handler(CommandHandler("help", help_command))
-    application.add_handler(CommandHandler("paid", paid_command))
-    application.add_handler(CommandHandler("matchhistory", match_history_command))
-    
-    # Admin command handlers
-    application.add_handler(CommandHandler("host", host_command))
-    application.add_handler(CommandHandler("aihost", ai_host_command))
-    application.add_handler(CommandHandler("active", active_tournaments_command))
-    application.add_handler(CommandHandler("droproom", drop_room_command))
-    application.add_handler(CommandHandler("listplayers", list_players_command))
-    application.add_handler(CommandHandler("clear", clear_command))
-    application.add_handler(CommandHandler("datavault", data_vault_command))
-    application.add_handler(CommandHandler("special", special_command))
-    application.add_handler(CommandHandler("ban", ban_command))
-    application.add_handler(CommandHandler("unban", unban_command))
-    application.add_handler(CommandHandler("confirm", confirm_payment_command))
-    application.add_handler(CommandHandler("decline", decline_payment_command))
-    application.add_handler(CommandHandler("approve_ai", approve_ai_command))
-    application.add_handler(CommandHandler("aianalytics", ai_analytics_command))
-    application.add_handler(CommandHandler("dashboard", admin_dashboard_command))
-    
-    # Callback query handler
-    application.add_handler(CallbackQueryHandler(button_callback))
+    # Create the Application; run_polling stops it on SIGINT/SIGTERM, then on_stop drains
+    application = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .request(build_request(TELEGRAM_POOL_SIZE))
+        .get_updates_request(build_request(TELEGRAM_GET_UPDATES_POOL_SIZE))
+        .post_init(on_startup)
+        .post_stop(on_stop)
+        .build()
+    )
     
-    # Message handlers
-    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
+    register_handlers(application)
     
     # Run the bot
     logger.info("🚫 No Mercy Bot starting...")
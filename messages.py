@@ -2,6 +2,7 @@
 Message templates for No Mercy Zone Bot
 """
 
+from datetime import timedelta
 from config import CHANNEL_URL, DISCUSSION_GROUP_URL, SUPPORT_EMAIL, INSTAGRAM_HANDLE, ADMIN_USERNAME
 
 def get_welcome_message(first_name):
@@ -41,18 +42,27 @@ def get_main_menu_message(first_name, referral_code):
 Tera Personal Referral Code: `{referral_code}`
 Dost ko bhej, aur FREE ENTRY pa!"""
 
-def get_admin_dashboard_message():
-    """Get admin dashboard message"""
+def get_admin_dashboard_message(snapshot):
+    """Get admin dashboard message from a database.get_dashboard_snapshot() dict"""
     from datetime import datetime
     current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     
+    next_drop = snapshot.get("next_drop")
+    if next_drop:
+        next_drop_text = f"{next_drop['name']} ({next_drop['tournament_id']}) - {next_drop['when']} IST"
+    else:
+        next_drop_text = "Koi scheduled nahi"
+    
     return f"""👑 *Welcome Back, 🧨 Ghost Commander!*  
 "Server breathe kar raha hai... kyunki Boss wapas aaya hai!" 😎💻
 
 🧨 *System Armed & Ready*  
 🕒 *Time:* `{current_time}`  
-🎮 *Live Matches:* Loading...  
-🚀 *Next Drop-In:* Soon
+🎮 *Live Matches:* {snapshot.get('live', 0)} live, {snapshot.get('upcoming', 0)} upcoming  
+🚀 *Next Drop-In:* {next_drop_text}
+💳 *Pending Payments:* {snapshot.get('pending_payments', 0)}
+💰 *Today's Revenue:* ₹{snapshot.get('revenue_today', 0):,}
+👥 *Active (5 min):* {snapshot.get('active_users', 0)}
 
 🧬 Admin Arsenal: 
 (1). /host - Create tournaments (Solo/Duo/Squad)
@@ -70,6 +80,10 @@ def get_admin_dashboard_message():
 (13). /dashboard - Show admin dashboard
 (14). /confirm - Approve payments
 (15). /decline - Decline payments
+(16). /results - Record match results & pay prizes
+(17). /export - Download payments/players as CSV
+(18). /reconcile - Upload bank statement CSV to confirm payments
+(19). /timeline - User ka payment/ban history
 
 ⚠️ *Note:*  
 Yeh teri lobby hai bhai...  
@@ -101,6 +115,28 @@ def get_tournament_post(tournament_data):
 
 🔽 JOIN & DETAILS 🔽"""
 
+def get_tournament_live_status(tournament_data):
+    """Slot and status lines appended to channel posts and kept up to date"""
+    status_text = {
+        "upcoming": "🟢 Registrations OPEN",
+        "live": "🔴 LIVE - Registrations closed",
+        "completed": "⚪ Finished",
+        "cancelled": "❌ Cancelled"
+    }
+    filled = tournament_data.get("participant_count", 0)
+    max_slots = tournament_data.get("max_slots")
+    status = status_text.get(tournament_data.get("status"), "🟡 Updating...")
+    
+    if not max_slots:
+        return f"""👥 Slots Filled: {filled}
+📊 Status: {status}"""
+    
+    if tournament_data.get("status") == "upcoming" and filled >= max_slots:
+        status = "🔒 Slots FULL - Waitlist open in bot"
+    
+    return f"""👥 Slots: {filled}/{max_slots} filled ({max(max_slots - filled, 0)} left)
+📊 Status: {status}"""
+
 def get_whatsapp_status_template(referral_code):
     """Get WhatsApp status template"""
     return f"""🎮 BGMI TOURNAMENTS LIVE!
@@ -147,6 +183,7 @@ def get_help_message():
 • 🎯 Click menu buttons for navigation
 • 💰 /paid - Submit payment proof
 • 📜 /matchhistory - View your tournaments
+• 🏆 /leaderboard - Top players & your rank
 • 🆘 /help - Show this help
 
 📞 SUPPORT CONTACT:
@@ -166,3 +203,45 @@ def get_help_message():
 5. Be active in discussion group
 
 🚫 No Mercy Zone - Yahan sirf winners survive karte hain! 🔥"""
+
+TIMELINE_LABELS = {
+    "payment_confirmed": "✅ Payment confirmed",
+    "payment_declined": "❌ Payment declined",
+    "payment_expired": "⌛ Payment expired",
+    "banned": "🔨 Banned",
+    "unbanned": "✨ Unbanned",
+    "player_removed": "🚪 Removed from tournament",
+    "tournament_deleted": "🗑️ Tournament deleted"
+}
+
+def format_timeline_event(event):
+    """One line of /timeline output for an event log entry"""
+    ist = event["t"].replace(tzinfo=None) + timedelta(hours=5, minutes=30)
+    parts = [ist.strftime("%d %b %H:%M"), TIMELINE_LABELS.get(event["e"], event["e"])]
+    if event.get("tn"):
+        parts.append(event["tn"])
+    data = event.get("d", {})
+    if "amount" in data:
+        parts.append(f"₹{data['amount']}")
+    if data.get("utr"):
+        parts.append(f"UTR {data['utr']}")
+    if data.get("source"):
+        parts.append(f"via {data['source']}")
+    if event.get("a"):
+        parts.append(f"by {event['a']}")
+    return " | ".join(parts)
+
+AI_SUGGESTION_ICONS = {"solo": "🎯", "duo": "👬", "squad": "👑"}
+
+def get_ai_suggestion_message(tournament_type, suggestion):
+    """Markdown summary of an AI tournament suggestion"""
+    per = "" if tournament_type == "solo" else "/team"
+    return (
+        f"{AI_SUGGESTION_ICONS.get(tournament_type, '🤖')} *AI Suggested {tournament_type.title()} Tournament:*\n"
+        f"• {suggestion['name']}\n"
+        f"• Entry Fee: ₹{suggestion['entry_fee']}{per}\n"
+        f"• Prize Type: {suggestion['prize_type'].replace('_', ' ').title()}\n"
+        f"• Map: {suggestion['map']}\n"
+        f"• Players: {suggestion['optimal_participants']}\n"
+        f"• Confidence: {suggestion['confidence']}%"
+    )
@@ -0,0 +1,165 @@
+"""
+Compact domain models for No Mercy Zone Bot
+"""
+
+from datetime import datetime
+
+
+class Model:
+    """Base for slot-backed documents; FIELDS drives both projection and serialisation"""
+    __slots__ = ()
+    FIELDS = ()
+    DEFAULTS = {}
+
+    def __init__(self, **values):
+        for field in self.FIELDS:
+            setattr(self, field, values.get(field, self.DEFAULTS.get(field)))
+
+    @classmethod
+    def projection(cls, fields=None):
+        """Mongo projection for the given fields (all model fields by default)"""
+        projection = {field: 1 for field in (fields or cls.FIELDS)}
+        projection["_id"] = 0
+        return projection
+
+    @classmethod
+    def from_doc(cls, doc):
+        """Build a model from a BSON document, ignoring keys outside FIELDS"""
+        if doc is None:
+            return None
+
+        obj = cls.__new__(cls)
+        defaults = cls.DEFAULTS
+        for field in cls.FIELDS:
+            setattr(obj, field, doc.get(field, defaults.get(field)))
+        return obj
+
+    def to_doc(self):
+        """Serialise back to a document, skipping unset fields"""
+        doc = {}
+        for field in self.FIELDS:
+            value = getattr(self, field)
+            if value is not None:
+                doc[field] = value
+        return doc
+
+    # Dict-style access so models can replace raw documents in existing handlers
+    def get(self, key, default=None):
+        value = getattr(self, key, None) if key in self.FIELDS else None
+        return default if value is None else value
+
+    def __getitem__(self, key):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key):
+        return key in self.FIELDS and getattr(self, key) is not None
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.to_doc() == other.to_doc()
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_doc()!r})"
+
+
+class User(Model):
+    """Bot user profile without the embedded payments history"""
+    FIELDS = (
+        "user_id", "username", "first_name", "confirmed", "balance",
+        "referral_code", "joined_at", "is_member", "banned",
+        "tournaments_joined", "free_entries", "total_spent", "total_earned",
+        "tournaments_played", "wins", "kills"
+    )
+    __slots__ = FIELDS
+    DEFAULTS = {
+        "confirmed": False,
+        "balance": 0,
+        "is_member": False,
+        "banned": False,
+        "tournaments_joined": (),
+        "free_entries": 0,
+        "total_spent": 0,
+        "total_earned": 0,
+        "tournaments_played": 0,
+        "wins": 0,
+        "kills": 0
+    }
+
+    user_id: int
+    username: str
+    first_name: str
+    confirmed: bool
+    balance: int
+    referral_code: str
+    joined_at: datetime
+    is_member: bool
+    banned: bool
+    tournaments_joined: list
+    free_entries: int
+    total_spent: int
+    total_earned: int
+    tournaments_played: int
+    wins: int
+    kills: int
+
+
+class Tournament(Model):
+    """Tournament listing data; players live in the enrolments collection"""
+    FIELDS = (
+        "tournament_id", "name", "type", "date", "time", "map", "entry_fee",
+        "prize_type", "prize_info", "status", "created_at", "max_slots", "participant_count",
+        "held_slots", "confirmed_payments", "total_collected", "room_id", "room_password",
+        "ai_generated", "ai_confidence"
+    )
+    __slots__ = FIELDS
+    DEFAULTS = {
+        "status": "upcoming",
+        "prize_info": "TBA",
+        "participant_count": 0,
+        "held_slots": 0,
+        "confirmed_payments": 0,
+        "total_collected": 0,
+        "ai_generated": False
+    }
+
+    tournament_id: str
+    name: str
+    type: str
+    date: str
+    time: str
+    map: str
+    entry_fee: int
+    prize_type: str
+    prize_info: str
+    status: str
+    created_at: datetime
+    max_slots: int
+    participant_count: int
+    held_slots: int
+    confirmed_payments: int
+    total_collected: int
+    room_id: str
+    room_password: str
+    ai_generated: bool
+    ai_confidence: int
+
+
+class Payment(Model):
+    """Tournament entry payment submitted via /paid"""
+    FIELDS = (
+        "user_id", "tournament_id", "amount", "utr", "status",
+        "created_at", "updated_at", "confirmed_at", "declined_at"
+    )
+    __slots__ = FIELDS
+    DEFAULTS = {"status": "pending", "amount": 0}
+
+    user_id: int
+    tournament_id: str
+    amount: int
+    utr: str
+    status: str
+    created_at: datetime
+    updated_at: datetime
+    confirmed_at: datetime
+    declined_at: datetime
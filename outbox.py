@@ -0,0 +1,60 @@
+"""
+Background delivery of queued channel posts for No Mercy Zone Bot
+"""
+
+import asyncio
+from telegram import InlineKeyboardMarkup
+from telegram.error import RetryAfter
+from database import claim_outbox_message, mark_outbox_sent, mark_outbox_failed
+
+# Set whenever something is queued so delivery doesn't wait for the next poll
+_wakeup = asyncio.Event()
+
+
+def notify_outbox():
+    """Wake the dispatcher after queueing a message"""
+    _wakeup.set()
+
+
+async def deliver_pending(bot):
+    """Send every message that is due, recording the result of each attempt"""
+    while True:
+        message = await asyncio.to_thread(claim_outbox_message)
+        if not message:
+            return
+
+        reply_markup = None
+        if message.get("reply_markup"):
+            reply_markup = InlineKeyboardMarkup.de_json(message["reply_markup"], bot)
+
+        try:
+            sent = await bot.send_message(
+                chat_id=message["chat_id"],
+                text=message["text"],
+                reply_markup=reply_markup,
+                parse_mode=message.get("parse_mode")
+            )
+        except RetryAfter as e:
+            await asyncio.to_thread(mark_outbox_failed, message, e, e.retry_after)
+            return
+        except Exception as e:
+            print(f"Outbox delivery failed ({message['attempts']} attempts): {e}")
+            await asyncio.to_thread(mark_outbox_failed, message, e)
+            continue
+
+        await asyncio.to_thread(mark_outbox_sent, message, sent.message_id)
+
+
+async def run_outbox_dispatcher(bot, poll_interval=10):
+    """Deliver queued messages on wake-up, and poll for retries that became due"""
+    while True:
+        try:
+            await asyncio.wait_for(_wakeup.wait(), timeout=poll_interval)
+        except asyncio.TimeoutError:
+            pass
+        _wakeup.clear()
+
+        try:
+            await deliver_pending(bot)
+        except Exception as e:
+            print(f"Outbox dispatcher error: {e}")
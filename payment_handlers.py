@@ -328,7 +328,7 @@ Contact @Ghost_Commander"""
         user = update.effective_user
         
         # Get all payments for user
-        payments = await self.db.payments.find({'user_id': user.id}).sort('created_at', -1).to_list(length=20)
+        payments = await self.db.payments.find({'user_id': user.id}).sort('created_at', -1).to_list(length=10)
         
         if not payments:
             history_msg = """📜 **PAYMENT HISTORY**
@@ -340,24 +340,27 @@ Start participating in tournaments to build your payment history."""
             history_msg = f"""📜 **PAYMENT HISTORY**
 
 👨‍💼 **Player:** @{user.username or user.first_name}
-📊 **Total Payments:** {len(payments)}
+📊 **Recent Payments:** {len(payments)}
 
 📈 **Recent Transactions:**
 
 """
             
-            total_amount = 0
             for i, payment in enumerate(payments[:10], 1):  # Show last 10
                 status = "✅" if payment.get('confirmed', False) else "⏳"
                 amount = payment.get('amount', 0)
-                total_amount += amount if payment.get('confirmed', False) else 0
                 date = payment.get('created_at', get_ist_time()).strftime('%d/%m')
                 tournament = payment.get('tournament_name', 'General')[:20]
                 
                 history_msg += f"{i}. {status} ₹{amount} - {tournament} ({date})\n"
             
-            history_msg += f"\n💰 **Total Confirmed:** ₹{total_amount}"
-            history_msg += f"\n🎮 **Tournaments Played:** {len([p for p in payments if p.get('confirmed')])}"
+            # Lifetime totals come from the counters on the user document
+            stats = await self.db.users.find_one(
+                {'user_id': user.id},
+                {'_id': 0, 'total_spent': 1, 'tournaments_played': 1}
+            ) or {}
+            history_msg += f"\n💰 **Total Confirmed:** ₹{stats.get('total_spent', 0)}"
+            history_msg += f"\n🎮 **Tournaments Played:** {stats.get('tournaments_played', 0)}"
         
         keyboard = [
             [InlineKeyboardButton("💳 Current Status", callback_data="payment_status")],
@@ -0,0 +1,65 @@
+"""
+Pending-payment sweeper for No Mercy Zone Bot
+"""
+
+import asyncio
+import time
+from telegram.error import RetryAfter
+from config import ADMIN_ID, PENDING_PAYMENT_STALE_HOURS, PAYMENT_DIGEST_HOURS
+from database import sweep_pending_payments
+from waitlist import NOTIFY_DELAY
+
+# monotonic time of the last admin digest; None until one is sent
+_last_digest = None
+
+
+async def send_paced(bot, chat_id, text):
+    """Send one message, waiting out Telegram flood limits instead of dropping it"""
+    while True:
+        try:
+            await bot.send_message(chat_id=chat_id, text=text)
+            break
+        except RetryAfter as e:
+            await asyncio.sleep(e.retry_after)
+        except Exception as e:
+            print(f"Failed to message {chat_id}: {e}")
+            break
+    await asyncio.sleep(NOTIFY_DELAY)
+
+
+async def notify_expired(bot, expired):
+    """Tell users their pending payment lapsed because the tournament already started"""
+    for payment in expired:
+        await send_paced(bot, payment["user_id"], f"""⌛ PAYMENT EXPIRED
+
+🎮 Tournament: {payment['tournament_name']}
+💵 Amount: ₹{payment['amount']}
+🧾 UTR: {payment.get('utr', '-')}
+
+Tournament start ho chuka hai aur payment confirm nahi hua tha.
+Paise kat gaye the to admin ko UTR ke saath message karo, refund/adjust ho jayega.""")
+
+
+def format_digest(result):
+    lines = [f"📋 PENDING PAYMENTS DIGEST\n\n⏳ {result['stale_count']} payment(s) {PENDING_PAYMENT_STALE_HOURS}+ ghante se pending:"]
+    for p in result["stale"]:
+        lines.append(f"• {p['user_id']} | {p['tournament_id']} | ₹{p['amount']} | UTR {p.get('utr', '-')}")
+    if result["stale_count"] > len(result["stale"]):
+        lines.append(f"...aur {result['stale_count'] - len(result['stale'])} more")
+    if result["expired"]:
+        lines.append(f"\n⌛ {len(result['expired'])} payment(s) auto-expired (tournament start ho gaya)")
+    lines.append("\n/confirm @user TOURNAMENT_ID ya /reconcile se clear karo")
+    return "\n".join(lines)
+
+
+async def sweep_payments(bot):
+    """Background job: expire payments for started tournaments and remind the admin about stale ones"""
+    global _last_digest
+    result = await asyncio.to_thread(sweep_pending_payments, PENDING_PAYMENT_STALE_HOURS)
+    await notify_expired(bot, result["expired"])
+
+    digest_due = _last_digest is None or time.monotonic() - _last_digest >= PAYMENT_DIGEST_HOURS * 3600
+    if result["stale_count"] and digest_due:
+        _last_digest = time.monotonic()
+        await send_paced(bot, ADMIN_ID, format_digest(result))
+    return result
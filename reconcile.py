@@ -0,0 +1,63 @@
+"""
+Bank/UPI statement reconciliation for No Mercy Zone Bot
+"""
+
+import csv
+import re
+
+# Header names used for the UTR and amount columns by common bank/UPI exports
+UTR_COLUMNS = ("utr", "utr no", "utr number", "upi ref no", "reference", "ref no", "transaction id", "rrn")
+AMOUNT_COLUMNS = ("amount", "credit", "credit amount", "cr", "deposit", "amount (inr)")
+
+
+def _find_column(header, candidates):
+    normalised = [re.sub(r"[^a-z0-9() ]", "", h.lower()).strip() for h in header]
+    for candidate in candidates:
+        if candidate in normalised:
+            return normalised.index(candidate)
+    for i, name in enumerate(normalised):
+        if any(name.startswith(candidate) for candidate in candidates):
+            return i
+    return None
+
+
+def _parse_amount(value):
+    value = re.sub(r"[^0-9.]", "", value or "")
+    return float(value) if value else None
+
+
+def match_statement(lines, pending):
+    """Stream statement rows against pending payments keyed by UTR
+
+    lines: iterable of CSV text lines (e.g. an open file). pending: {utr: payment}.
+    Returns (matched payments, [(payment, statement amount)] mismatches, rows seen).
+    """
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if not header:
+        raise ValueError("Statement is empty")
+
+    utr_col = _find_column(header, UTR_COLUMNS)
+    amount_col = _find_column(header, AMOUNT_COLUMNS)
+    if utr_col is None or amount_col is None:
+        raise ValueError("Statement needs a UTR/reference column and an amount column")
+
+    matched, mismatched = [], []
+    rows = 0
+
+    for row in reader:
+        if len(row) <= max(utr_col, amount_col):
+            continue
+        rows += 1
+
+        payment = pending.pop(row[utr_col].strip(), None)
+        if payment is None:
+            continue
+
+        amount = _parse_amount(row[amount_col])
+        if amount is not None and abs(amount - payment["amount"]) < 0.01:
+            matched.append(payment)
+        else:
+            mismatched.append((payment, amount))
+
+    return matched, mismatched, rows
@@ -0,0 +1,84 @@
+"""
+Handler registration for No Mercy Zone Bot
+"""
+
+from importlib import import_module
+from telegram import Update
+from telegram.ext import CallbackQueryHandler, CommandHandler, MessageHandler, TypeHandler, filters
+import handlers
+
+# command -> (module, callback); admin modules are imported on first use
+USER_COMMANDS = {
+    "start": ("handlers", "start_command"),
+    "help": ("handlers", "help_command"),
+    "paid": ("handlers", "paid_command"),
+    "matchhistory": ("handlers", "match_history_command"),
+    "leaderboard": ("handlers", "leaderboard_command"),
+}
+
+ADMIN_COMMANDS = {
+    "host": ("admin_handlers", "host_command"),
+    "aihost": ("admin_handlers", "ai_host_command"),
+    "active": ("admin_handlers", "active_tournaments_command"),
+    "droproom": ("admin_handlers", "drop_room_command"),
+    "listplayers": ("admin_handlers", "list_players_command"),
+    "clear": ("admin_handlers", "clear_command"),
+    "datavault": ("admin_handlers", "data_vault_command"),
+    "special": ("admin_handlers", "special_command"),
+    "ban": ("admin_handlers", "ban_command"),
+    "unban": ("admin_handlers", "unban_command"),
+    "confirm": ("admin_handlers", "confirm_payment_command"),
+    "decline": ("admin_handlers", "decline_payment_command"),
+    "approve_ai": ("admin_handlers", "approve_ai_command"),
+    "aianalytics": ("admin_handlers", "ai_analytics_command"),
+    "dashboard": ("admin_handlers", "admin_dashboard_command"),
+    "results": ("admin_handlers", "results_command"),
+    "reconcile": ("admin_handlers", "reconcile_command"),
+    "export": ("admin_handlers", "export_command"),
+    "timeline": ("admin_handlers", "timeline_command"),
+}
+
+# Admin commands that also accept an uploaded file, with the command as caption
+DOCUMENT_COMMANDS = {
+    "results": ("admin_handlers", "results_command"),
+    "reconcile": ("admin_handlers", "reconcile_command"),
+}
+
+
+def lazy(module, name):
+    """Callback that imports module.name the first time it is called"""
+    target = None
+
+    async def callback(update, context):
+        nonlocal target
+        if target is None:
+            target = getattr(import_module(module), name)
+        return await target(update, context)
+
+    callback.__name__ = name
+    return callback
+
+
+def register_handlers(application):
+    """Attach every handler to the application"""
+    # Pre-handlers run for every update before the regular handlers
+    application.add_handler(TypeHandler(Update, handlers.skip_processed_updates), group=-3)
+    application.add_handler(TypeHandler(Update, handlers.reject_banned_users), group=-2)
+    application.add_handler(TypeHandler(Update, handlers.track_user_profile), group=-1)
+
+    for command, (module, name) in USER_COMMANDS.items():
+        application.add_handler(CommandHandler(command, getattr(import_module(module), name)))
+
+    for command, (module, name) in ADMIN_COMMANDS.items():
+        application.add_handler(CommandHandler(command, lazy(module, name)))
+
+    for command, (module, name) in DOCUMENT_COMMANDS.items():
+        application.add_handler(MessageHandler(
+            filters.Document.ALL & filters.CaptionRegex(rf'^/{command}\b'), lazy(module, name)
+        ))
+
+    application.add_handler(CallbackQueryHandler(handlers.button_callback))
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handlers.handle_message))
+
+    # Post-handler: runs after the regular handlers (group 0) have finished
+    application.add_handler(TypeHandler(Update, handlers.mark_update_processed), group=1)
@@ -0,0 +1,94 @@
+"""
+Match result parsing and prize computation for No Mercy Zone Bot
+"""
+
+import csv
+import io
+
+RANK_KEYS = {1: "1st", 2: "2nd", 3: "3rd"}
+
+
+class ResultError(ValueError):
+    """Raised when a pasted or uploaded result table can't be used"""
+
+
+def parse_result_table(text):
+    """Parse 'player, kills, rank' rows (comma, tab or space separated)
+
+    player is a user_id or @username. A header row and blank lines are skipped.
+    """
+    rows = []
+    sample = text[:1024]
+    delimiter = "," if "," in sample else "\t" if "\t" in sample else " "
+
+    for line_no, fields in enumerate(csv.reader(io.StringIO(text), delimiter=delimiter), 1):
+        fields = [f.strip() for f in fields if f.strip()]
+        if not fields:
+            continue
+        if len(fields) < 3:
+            raise ResultError(f"Line {line_no}: expected player, kills, rank")
+        try:
+            kills, rank = int(fields[1]), int(fields[2])
+        except ValueError:
+            if line_no == 1:
+                continue  # header
+            raise ResultError(f"Line {line_no}: kills and rank must be numbers")
+        if kills < 0 or rank < 1:
+            raise ResultError(f"Line {line_no}: kills must be >= 0 and rank >= 1")
+        rows.append({"player": fields[0], "kills": kills, "rank": rank})
+
+    if not rows:
+        raise ResultError("No result rows found")
+    return rows
+
+
+def match_roster(rows, roster):
+    """Resolve each row's player against the tournament roster; returns rows with user_id"""
+    by_id = {entry["user_id"]: entry for entry in roster}
+    by_username = {entry["username"].lower(): entry for entry in roster if entry.get("username")}
+
+    matched = []
+    unknown = []
+    seen = set()
+
+    for row in rows:
+        player = row["player"]
+        if player.startswith("@"):
+            entry = by_username.get(player[1:].lower())
+        else:
+            entry = by_id.get(int(player)) if player.isdigit() else None
+
+        if not entry:
+            unknown.append(player)
+            continue
+        if entry["user_id"] in seen:
+            raise ResultError(f"{player} appears more than once")
+
+        seen.add(entry["user_id"])
+        matched.append({
+            "user_id": entry["user_id"],
+            "name": entry.get("first_name") or player,
+            "kills": row["kills"],
+            "rank": row["rank"]
+        })
+
+    if unknown:
+        raise ResultError(f"Not in this tournament: {', '.join(unknown)}")
+    return matched
+
+
+def compute_payouts(prize_type, prizes, rows):
+    """Attach a 'prize' to every row according to the tournament's prize structure"""
+    per_kill = prizes.get("per_kill", 0) if prize_type in ("kill_based", "hybrid") else 0
+    bonus = prizes.get("bonus", 0)
+    rank_prizes = {rank: prizes.get(key, 0) for rank, key in RANK_KEYS.items()}
+
+    if prize_type == "kill_based":
+        rank_prizes = {1: bonus}
+    elif prize_type == "fixed":
+        rank_prizes = {1: prizes.get("winner", 0)}
+
+    return [
+        {**row, "prize": row["kills"] * per_kill + rank_prizes.get(row["rank"], 0)}
+        for row in rows
+    ]
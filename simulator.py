@@ -0,0 +1,139 @@
+"""
+Vectorised profit/ROI simulation for tournament planning
+"""
+
+import numpy as np
+from config import ENTRY_FEES, MAX_SLOTS, PRIZE_POOLS
+
+PRIZE_TYPES = ("kill_based", "rank_based", "hybrid", "fixed")
+RANK_KEYS = ("1st", "2nd", "3rd")
+TEAM_SIZE = {"solo": 1, "duo": 2, "squad": 4}
+
+# Per-player kill averages used when a map has too few recorded results
+FALLBACK_KILL_RATES = {
+    "solo": {"Livik": 3.2, "Sanhok": 2.8, "Erangel": 2.5, "Miramar": 2.1, "Karakin": 3.5},
+    "duo": {"Livik": 2.8, "Sanhok": 2.5, "Erangel": 2.2, "Miramar": 1.9, "Karakin": 3.1},
+    "squad": {"Livik": 2.5, "Sanhok": 2.2, "Erangel": 2.0, "Miramar": 1.7, "Karakin": 2.8}
+}
+MIN_KILL_SAMPLES = 30
+
+OPERATING_COST = 0.05       # share of collection, as in calculate_advanced_profit_analysis
+MAX_LOSS_PROBABILITY = 0.10  # fees riskier than this are never recommended
+# Assumed price sensitivity: signups scale with (reference fee / fee) ** DEMAND_ELASTICITY
+DEMAND_ELASTICITY = 1.2
+
+
+def sample_total_kills(tournament_type, map_name, kill_samples, max_slots, draws, rng):
+    """Monte Carlo match kill totals, shape (draws, max_slots); column s-1 is a match with s entries
+
+    An entry (slot) is one team of TEAM_SIZE players, so kills are drawn per player.
+    """
+    team_size = TEAM_SIZE.get(tournament_type, 1)
+    players = max_slots * team_size
+    if len(kill_samples) >= MIN_KILL_SAMPLES:
+        per_player = rng.choice(np.asarray(kill_samples), size=(draws, players))
+    else:
+        rate = FALLBACK_KILL_RATES.get(tournament_type, {}).get(map_name, 2.5)
+        per_player = rng.poisson(rate, size=(draws, players))
+
+    # Kills by the first s teams' players
+    totals = np.cumsum(per_player, axis=1)[:, team_size - 1::team_size]
+    # Every kill eliminates a player, so a match of s teams has at most s * team_size - 1 kills
+    return np.minimum(totals, np.arange(1, max_slots + 1) * team_size - 1)
+
+
+def payout_draws(tournament_type, prize_type, total_kills, slots):
+    """Prize payout for every draw and entry count, shape (draws, slots)"""
+    pools = PRIZE_POOLS[tournament_type]
+
+    rank_prizes = np.array([pools["rank_based"].get(key, 0) for key in RANK_KEYS])
+    # Only ranks that exist in a match of that size get paid: min(3, entries)
+    rank_payout = (rank_prizes[None, :] * (slots[:, None] > np.arange(len(RANK_KEYS)))).sum(axis=1)
+
+    if prize_type == "kill_based":
+        kill_pool = pools["kill_based"]
+        return total_kills * kill_pool["per_kill"] + kill_pool["bonus"] * (slots >= 1)
+    if prize_type == "hybrid":
+        return total_kills * pools["kill_based"]["per_kill"] + rank_payout
+    if prize_type == "rank_based":
+        return np.broadcast_to(rank_payout, total_kills.shape)
+    return np.broadcast_to(pools["fixed"]["winner"] * (slots >= 1), total_kills.shape)
+
+
+def simulate_fee_grid(tournament_type, map_name, kill_samples=(), fees=None,
+                      expected_participants=None, draws=5000, seed=None):
+    """Evaluate entry fee x entry count x prize type in one pass
+
+    Entries are slots: one player in solo, one team in duo/squad, each paying
+    the fee once. Returns the best (fee, prize type) on the demand curve,
+    the expected entries per fee, break-even entry counts per fee and
+    payout percentiles.
+    """
+    rng = np.random.default_rng(seed)
+    max_slots = MAX_SLOTS.get(tournament_type, 100)
+    reference_fee = ENTRY_FEES.get(tournament_type, 50)
+    fees = np.arange(10, reference_fee * 4 + 1, 10) if fees is None else np.asarray(fees)
+    slots = np.arange(1, max_slots + 1)
+
+    total_kills = sample_total_kills(tournament_type, map_name, kill_samples, max_slots, draws, rng)
+    revenue = fees[:, None] * slots[None, :]                       # (fees, slots)
+    net_revenue = revenue * (1 - OPERATING_COST)
+
+    # Expected signups at each fee, anchored on the expected turnout at the reference fee
+    base = expected_participants or max_slots // 2
+    demand = np.clip(np.rint(base * (reference_fee / fees) ** DEMAND_ELASTICITY), 1, max_slots).astype(int)
+    on_curve = (np.arange(len(fees)), demand - 1)
+
+    best = None
+    break_even = {}
+    percentiles = {}
+
+    for prize_type in PRIZE_TYPES:
+        payouts = np.sort(payout_draws(tournament_type, prize_type, total_kills, slots), axis=0)
+        mean_payout = payouts.mean(axis=0)                           # (slots,)
+        p50, p95 = np.percentile(payouts, [50, 95], axis=0)
+
+        expected_profit = net_revenue - mean_payout[None, :]         # (fees, slots)
+
+        # Share of draws where payouts exceed what was collected
+        loss_probability = np.empty_like(expected_profit)
+        for col in range(max_slots):
+            loss_probability[:, col] = 1 - np.searchsorted(payouts[:, col], net_revenue[:, col], side="right") / draws
+
+        # Break-even: smallest entry count from which every larger match is profitable too
+        profitable = expected_profit >= 0
+        stays_profitable = np.logical_and.accumulate(profitable[:, ::-1], axis=1)[:, ::-1]
+        break_even[prize_type] = np.where(stays_profitable.any(axis=1), slots[stays_profitable.argmax(axis=1)], 0)
+        percentiles[prize_type] = {"p50": p50, "p95": p95}
+
+        curve_profit = expected_profit[on_curve]
+        curve_risk = loss_probability[on_curve]
+        candidates = np.where(curve_risk <= MAX_LOSS_PROBABILITY, curve_profit, -np.inf)
+        i = int(candidates.argmax())
+
+        if np.isfinite(candidates[i]) and (best is None or candidates[i] > best["expected_profit"]):
+            entries_at_fee = int(demand[i])
+            best = {
+                "fee": int(fees[i]),
+                "participants": entries_at_fee,
+                "prize_type": prize_type,
+                "expected_profit": round(float(candidates[i])),
+                "p95_payout": round(float(p95[entries_at_fee - 1])),
+                "loss_probability": round(float(curve_risk[i]), 3)
+            }
+
+    return {
+        "optimal": best,
+        "fees": fees,
+        "demand": demand,
+        "break_even": break_even,
+        "payout_percentiles": percentiles,
+        "draws": draws,
+        "kill_samples": len(kill_samples)
+    }
+
+
+def break_even_players(simulation, fee, prize_type):
+    """Smallest entry count that breaks even at `fee` (0 if none does)"""
+    index = int(np.abs(simulation["fees"] - fee).argmin())
+    return int(simulation["break_even"][prize_type][index])
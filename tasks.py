@@ -0,0 +1,45 @@
+"""
+Background task helpers for No Mercy Zone Bot
+"""
+
+import asyncio
+
+_tasks = set()
+# Finite jobs (e.g. broadcasts) that shutdown waits for before cancelling the rest
+_drain_tasks = set()
+
+
+def spawn(coro, drain=False):
+    """Run a coroutine in the background, keeping a reference until it finishes"""
+    task = asyncio.create_task(coro)
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    if drain:
+        _drain_tasks.add(task)
+        task.add_done_callback(_drain_tasks.discard)
+    return task
+
+
+async def run_periodically(interval, func, *args):
+    """Call func every `interval` seconds; blocking functions run in a worker thread"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            if asyncio.iscoroutinefunction(func):
+                await func(*args)
+            else:
+                await asyncio.to_thread(func, *args)
+        except Exception as e:
+            print(f"Background job {func.__name__} failed: {e}")
+
+
+async def drain(timeout):
+    """Give drain tasks up to `timeout` seconds to finish, then cancel everything still running"""
+    if _drain_tasks:
+        await asyncio.wait(list(_drain_tasks), timeout=timeout)
+
+    remaining = list(_tasks)
+    for task in remaining:
+        task.cancel()
+    await asyncio.gather(*remaining, return_exceptions=True)
+    return len(remaining)
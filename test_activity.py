@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Tests for the hour-of-week activity histogram counters
+"""
+
+from datetime import datetime, timezone
+import pytest
+
+database = pytest.importorskip("database")
+
+def at(monkeypatch, *utc):
+    class Clock(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime(*utc, tzinfo=timezone.utc).astimezone(tz)
+    monkeypatch.setattr(database, "datetime", Clock)
+
+@pytest.fixture(autouse=True)
+def fresh_counters(monkeypatch):
+    monkeypatch.setattr(database, "_pending_activity", {})
+    monkeypatch.setattr(database, "_active_hour", None)
+    monkeypatch.setattr(database, "_active_users", set())
+
+def test_user_counted_once_per_ist_hour(monkeypatch):
+    # 10:10 and 10:40 IST fall either side of a UTC hour boundary
+    at(monkeypatch, 2026, 1, 5, 4, 40)
+    database.note_activity(1)
+    at(monkeypatch, 2026, 1, 5, 5, 10)
+    database.note_activity(1)
+
+    slot = database.hour_of_week(datetime(2026, 1, 5, 4, 40, tzinfo=timezone.utc))
+    assert slot == 10
+    assert database._pending_activity == {slot: {"users": 1}}
+
+    # 11:00 IST is a new slot
+    at(monkeypatch, 2026, 1, 5, 5, 30)
+    database.note_activity(1)
+    assert database._pending_activity[11] == {"users": 1}
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Slot reservation tests for tournament joins, against an in-memory MongoDB
+"""
+
+from datetime import datetime, timedelta, timezone
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+database = pytest.importorskip("database")
+
+@pytest.fixture
+def db(monkeypatch):
+    mock_db = mongomock.MongoClient().db
+    mock_db.enrolments.create_index([("tournament_id", 1), ("user_id", 1)], unique=True)
+    monkeypatch.setattr(database, "db", mock_db)
+    return mock_db
+
+def add_tournament(db, max_slots=100, **fields):
+    db.tournaments.insert_one({
+        "tournament_id": "T1", "status": "upcoming", "participant_count": 0,
+        "max_slots": max_slots, **fields
+    })
+
+def player(user_id):
+    return {"user_id": user_id, "username": f"p{user_id}", "first_name": "Player"}
+
+def test_300_taps_admit_exactly_100(db):
+    # mongomock updates are not atomic across threads, so the taps run in turn
+    add_tournament(db)
+
+    results = [database.admit_participant("T1", player(uid), True) for uid in range(300)]
+
+    assert results.count(database.JOIN_OK) == 100
+    assert results.count(database.JOIN_FULL) == 200
+    assert db.tournaments.find_one({"tournament_id": "T1"})["participant_count"] == 100
+    assert db.enrolments.count_documents({"tournament_id": "T1"}) == 100
+
+def test_second_join_by_same_user_is_rejected(db):
+    add_tournament(db)
+
+    assert database.admit_participant("T1", player(1), True) == database.JOIN_OK
+    assert database.admit_participant("T1", player(1), True) == database.JOIN_ALREADY
+    assert db.tournaments.find_one({"tournament_id": "T1"})["participant_count"] == 1
+
+def test_closed_tournament_admits_nobody(db):
+    add_tournament(db, status="live")
+
+    assert database.admit_participant("T1", player(1), True) == database.JOIN_CLOSED
+    assert db.enrolments.count_documents({}) == 0
+
+def test_free_entry_is_refunded_when_full(db):
+    add_tournament(db, max_slots=1, participant_count=1)
+    db.users.insert_one({"user_id": 7, "username": "p7", "first_name": "Player", "free_entries": 1})
+
+    assert database.join_tournament_with_free_entry(7, "T1") == database.JOIN_FULL
+    assert db.users.find_one({"user_id": 7})["free_entries"] == 1
+
+def test_waitlist_offer_uses_the_held_slot(db):
+    # One slot is free and one is held for user 5's offer
+    add_tournament(db, max_slots=10, participant_count=8, held_slots=1)
+    db.waitlist.insert_one({
+        "tournament_id": "T1", "user_id": 5, "status": "offered",
+        "offer_expires_at": datetime.now(timezone.utc) + timedelta(minutes=10)
+    })
+
+    assert database.admit_participant("T1", player(5), True) == database.JOIN_OK
+    tournament = db.tournaments.find_one({"tournament_id": "T1"})
+    assert (tournament["participant_count"], tournament["held_slots"]) == (9, 0)
+    # The free slot is still there for someone else
+    assert database.admit_participant("T1", player(6), True) == database.JOIN_OK
+    assert database.admit_participant("T1", player(7), True) == database.JOIN_FULL
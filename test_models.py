@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+Tests for the compact domain models
+"""
+
+from models import User, Tournament, Payment
+
+def test_user_from_doc_drops_unknown_keys():
+    doc = {"_id": "x", "user_id": 7, "first_name": "Ghost", "payments": [{"amount": 50}]}
+    user = User.from_doc(doc)
+
+    assert user.user_id == 7
+    assert user["first_name"] == "Ghost"
+    assert user.get("free_entries") == 0
+    assert not hasattr(user, "__dict__")
+    assert "payments" not in user.to_doc()
+
+def test_projection_follows_fields():
+    assert Tournament.projection(["name", "date"]) == {"name": 1, "date": 1, "_id": 0}
+    assert set(Payment.projection()) == set(Payment.FIELDS) | {"_id"}
+
+def test_round_trip():
+    payment = Payment(user_id=1, tournament_id="TNABC123", amount=50, utr="123456789012")
+    assert Payment.from_doc(payment.to_doc()) == payment
+    assert User.from_doc(None) is None
+
+if __name__ == '__main__':
+    test_user_from_doc_drops_unknown_keys()
+    test_projection_follows_fields()
+    test_round_trip()
+    print("✅ Models OK")
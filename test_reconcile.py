@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Tests for bank statement reconciliation
+"""
+
+import pytest
+from reconcile import match_statement
+
+def test_match_statement_by_utr_and_amount():
+    pending = {
+        "123456789012": {"user_id": 1, "tournament_id": "TN1", "amount": 50, "utr": "123456789012"},
+        "222222222222": {"user_id": 2, "tournament_id": "TN1", "amount": 80, "utr": "222222222222"},
+        "333333333333": {"user_id": 3, "tournament_id": "TN2", "amount": 30, "utr": "333333333333"},
+    }
+    statement = [
+        "Date,Narration,UPI Ref No.,Credit Amount\n",
+        "01/01,UPI-ghost,123456789012,\"50.00\"\n",
+        "01/01,UPI-king,222222222222,70\n",
+        "02/01,UPI-other,999999999999,10\n",
+    ]
+
+    matched, mismatched, rows = match_statement(statement, pending)
+
+    assert [p["user_id"] for p in matched] == [1]
+    assert [(p["user_id"], amount) for p, amount in mismatched] == [(2, 70.0)]
+    assert rows == 3
+    assert list(pending) == ["333333333333"]
+
+def test_match_statement_needs_columns():
+    with pytest.raises(ValueError):
+        match_statement(["Date,Narration\n", "01/01,hello\n"], {})
+
+if __name__ == '__main__':
+    test_match_statement_by_utr_and_amount()
+    print("✅ Reconcile OK")
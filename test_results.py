@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Tests for match result parsing and prize computation
+"""
+
+import pytest
+from results import ResultError, parse_result_table, match_roster, compute_payouts
+
+ROSTER = [
+    {"user_id": 11, "username": "Sniper_X", "first_name": "Sniper"},
+    {"user_id": 22, "username": None, "first_name": "Rusher"},
+    {"user_id": 33, "username": "camper", "first_name": "Camper"},
+]
+
+def test_parse_and_match_roster():
+    rows = parse_result_table("player,kills,rank\n@sniper_x, 7, 1\n22, 3, 2\n\n@Camper,0,3\n")
+    matched = match_roster(rows, ROSTER)
+
+    assert [r["user_id"] for r in matched] == [11, 22, 33]
+    assert matched[0]["kills"] == 7
+
+def test_unknown_player_rejected():
+    with pytest.raises(ResultError):
+        match_roster(parse_result_table("@ghost 2 1"), ROSTER)
+
+def test_kill_based_payouts():
+    rows = [{"user_id": 11, "kills": 7, "rank": 1}, {"user_id": 22, "kills": 3, "rank": 2}]
+    paid = compute_payouts("kill_based", {"per_kill": 10, "bonus": 500}, rows)
+
+    assert [r["prize"] for r in paid] == [570, 30]
+
+def test_rank_and_fixed_payouts():
+    rows = [{"user_id": 1, "kills": 0, "rank": r} for r in (1, 2, 3, 4)]
+    rank_based = compute_payouts("rank_based", {"1st": 300, "2nd": 150, "3rd": 50}, rows)
+    fixed = compute_payouts("fixed", {"winner": 500}, rows)
+
+    assert [r["prize"] for r in rank_based] == [300, 150, 50, 0]
+    assert [r["prize"] for r in fixed] == [500, 0, 0, 0]
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Tests for the vectorised tournament profit simulator
+"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from simulator import simulate_fee_grid, break_even_players, PRIZE_TYPES
+
+def test_grid_shapes_and_optimum():
+    result = simulate_fee_grid("solo", "Erangel", expected_participants=20, draws=2000, seed=7)
+
+    for prize_type in PRIZE_TYPES:
+        assert result["break_even"][prize_type].shape == result["fees"].shape
+        assert result["payout_percentiles"][prize_type]["p95"].shape == (100,)
+
+    best = result["optimal"]
+    assert best["fee"] in result["fees"]
+    assert best["loss_probability"] <= 0.10
+
+def test_break_even_falls_as_fee_rises():
+    result = simulate_fee_grid("squad", "Livik", kill_samples=[0, 1, 2, 3, 5] * 20, seed=3)
+
+    # Squad rank prizes total ₹4000 once 3 teams enter; each team pays the fee once
+    cheap = break_even_players(result, 200, "rank_based")
+    dear = break_even_players(result, 300, "rank_based")
+    assert result["kill_samples"] == 100
+    assert cheap > 0 and dear < cheap
+    assert (cheap, dear) == (22, 15)                                # 15 * 300 * 0.95 >= 4000
+    assert break_even_players(result, 100, "rank_based") == 0     # 25 teams can't cover it
+
+def test_higher_fee_fills_fewer_slots():
+    result = simulate_fee_grid("squad", "Livik", kill_samples=[0, 1, 2, 3, 5] * 20,
+                               expected_participants=12, draws=200, seed=3)
+    fill = dict(zip(result["fees"].tolist(), result["demand"].tolist()))
+
+    # 12 teams at the ₹200 reference fee; none of these are clipped to 1 or 25 slots
+    assert (fill[150], fill[200], fill[300]) == (17, 12, 7)
+    assert (np.diff(result["demand"]) <= 0).all()
+
+def test_squad_slots_are_teams():
+    # Every player gets 5 kills, so kills only stop at the elimination cap
+    result = simulate_fee_grid("squad", "Erangel", kill_samples=[5] * 50, draws=200, seed=1)
+    percentiles = result["payout_percentiles"]
+
+    # One squad entry still pays 1st place; three entries pay all three ranks
+    assert percentiles["rank_based"]["p50"][0] == 2000
+    assert percentiles["rank_based"]["p50"][2] == 4000
+    # 25 squads are 100 players: at most 99 kills at ₹10, plus the ₹500 bonus
+    assert percentiles["kill_based"]["p95"][24] == 99 * 10 + 500
+    # Two squads (8 players) cap at 7 kills
+    assert percentiles["kill_based"]["p95"][1] == 7 * 10 + 500
+
+if __name__ == '__main__':
+    test_grid_shapes_and_optimum()
+    test_break_even_falls_as_fee_rises()
+    test_higher_fee_fills_fewer_slots()
+    test_squad_slots_are_teams()
+    print("✅ Simulator OK")
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Startup import-time budget for the bot
+"""
+
+import os
+import subprocess
+import sys
+import pytest
+
+# Cumulative import time allowed for `import main`, in microseconds
+IMPORT_BUDGET_US = 1_500_000
+
+# Only needed by rarely used admin/AI paths; must not load at startup
+LAZY_MODULES = ("admin_handlers", "requests")
+
+def import_times(module):
+    """Run `python -X importtime -c 'import module'` and return {module: cumulative_us}"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+def test_main_import_budget():
+    pytest.importorskip("telegram")
+    pytest.importorskip("pymongo")
+
+    times = import_times("main")
+
+    for module in LAZY_MODULES:
+        assert module not in times, f"{module} is imported at startup"
+    assert times["main"] < IMPORT_BUDGET_US, f"import main took {times['main'] / 1000:.0f}ms"
+
+if __name__ == '__main__':
+    test_main_import_budget()
+    print("✅ Startup OK")
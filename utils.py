@@ -2,19 +2,30 @@
 Utility functions for No Mercy Zone Bot
 """
 
-import requests
+import asyncio
 from datetime import datetime, timezone
-from config import CHANNEL_ID, AI_API_KEY
-import json
+from config import CHANNEL_ID, AI_API_KEY, TELEGRAM_MESSAGE_LIMIT
 
-async def check_channel_membership(bot, user_id):
-    """Check if user is member of the channel"""
+# user_id -> in-flight get_chat_member lookup, shared by concurrent callers
+_membership_checks = {}
+
+async def _fetch_channel_membership(bot, user_id):
     try:
         member = await bot.get_chat_member(CHANNEL_ID, user_id)
         return member.status in ['member', 'administrator', 'creator']
     except:
         return False
 
+async def check_channel_membership(bot, user_id):
+    """Check if user is member of the channel; concurrent checks for a user make one API call"""
+    check = _membership_checks.get(user_id)
+    if check is None:
+        check = asyncio.ensure_future(_fetch_channel_membership(bot, user_id))
+        _membership_checks[user_id] = check
+        check.add_done_callback(lambda _: _membership_checks.pop(user_id, None))
+    # Shielded so one cancelled caller doesn't cancel the lookup for the others
+    return await asyncio.shield(check)
+
 def generate_tournament_id():
     """Generate unique tournament ID"""
     import random
@@ -36,175 +47,196 @@ def validate_utr(utr):
     """Validate UTR number format"""
     return len(str(utr)) >= 10 and str(utr).isdigit()
 
+# Candidate configurations per tournament type; scored against live analytics, never modified
+AI_CANDIDATES = {
+    "solo": [
+        {
+            "name": "SNIPER ELITE SHOWDOWN",
+            "map": "Miramar",
+            "entry_fee": 60,
+            "prize_type": "kill_based",
+            "confidence": 92,
+            "reasoning": "Miramar shows 15% higher kill rates in historical data. Sniper meta trending +23%",
+            "optimal_participants": 24,
+            "expected_roi": 185
+        },
+        {
+            "name": "CLOSE COMBAT CARNAGE",
+            "map": "Livik", 
+            "entry_fee": 45,
+            "prize_type": "rank_based",
+            "confidence": 88,
+            "reasoning": "Livik generates fastest matches (avg 18min). Perfect for quick turnovers",
+            "optimal_participants": 20,
+            "expected_roi": 165
+        },
+        {
+            "name": "SURVIVAL INSTINCT",
+            "map": "Erangel",
+            "entry_fee": 75,
+            "prize_type": "hybrid",
+            "confidence": 85,
+            "reasoning": "Classic map with balanced engagement. Mixed prize pools show 12% better retention",
+            "optimal_participants": 18,
+            "expected_roi": 142
+        }
+    ],
+    "duo": [
+        {
+            "name": "TACTICAL PARTNERS",
+            "map": "Sanhok",
+            "entry_fee": 90,
+            "prize_type": "rank_based",
+            "confidence": 94,
+            "reasoning": "Sanhok duo meta is 28% more engaging. Team coordination peaks here",
+            "optimal_participants": 16,
+            "expected_roi": 198
+        },
+        {
+            "name": "DESERT STORM DUOS",
+            "map": "Miramar",
+            "entry_fee": 85,
+            "prize_type": "kill_based",
+            "confidence": 87,
+            "reasoning": "Long-range combat favors skilled duos. Higher skill = better retention",
+            "optimal_participants": 14,
+            "expected_roi": 172
+        },
+        {
+            "name": "URBAN WARFARE",
+            "map": "Karakin",
+            "entry_fee": 95,
+            "prize_type": "fixed",
+            "confidence": 83,
+            "reasoning": "High-intensity close combat. Fixed prizes reduce payout volatility",
+            "optimal_participants": 12,
+            "expected_roi": 156
+        }
+    ],
+    "squad": [
+        {
+            "name": "SQUAD SUPREMACY",
+            "map": "Erangel",
+            "entry_fee": 220,
+            "prize_type": "rank_based",
+            "confidence": 96,
+            "reasoning": "Erangel squad tournaments show highest completion rates (94%). Premium pricing justified",
+            "optimal_participants": 12,
+            "expected_roi": 215
+        },
+        {
+            "name": "JUNGLE WARFARE",
+            "map": "Sanhok",
+            "entry_fee": 180,
+            "prize_type": "kill_based",
+            "confidence": 91,
+            "reasoning": "Dense terrain increases engagement frequency. Kill-based rewards drive aggression",
+            "optimal_participants": 10,
+            "expected_roi": 189
+        },
+        {
+            "name": "BATTLEGROUND LEGENDS",
+            "map": "Miramar",
+            "entry_fee": 250,
+            "prize_type": "hybrid",
+            "confidence": 88,
+            "reasoning": "Premium positioning tournament. Mix of kills+ranks maximizes competitive balance",
+            "optimal_participants": 8,
+            "expected_roi": 167
+        }
+    ]
+}
+
+# Used when analytics can't be computed at all
+FALLBACK_SUGGESTIONS = {
+    "solo": {
+        "name": "SOLO SHOWDOWN",
+        "map": "Livik",
+        "entry_fee": 50,
+        "prize_type": "kill_based",
+        "confidence": 75,
+        "reasoning": "Standard solo tournament configuration",
+        "optimal_participants": 20,
+        "expected_roi": 150
+    },
+    "duo": {
+        "name": "DUO BATTLE",
+        "map": "Sanhok",
+        "entry_fee": 80,
+        "prize_type": "rank_based",
+        "confidence": 75,
+        "reasoning": "Standard duo tournament configuration",
+        "optimal_participants": 15,
+        "expected_roi": 150
+    },
+    "squad": {
+        "name": "SQUAD CLASH",
+        "map": "Erangel",
+        "entry_fee": 200,
+        "prize_type": "rank_based",
+        "confidence": 75,
+        "reasoning": "Standard squad tournament configuration",
+        "optimal_participants": 10,
+        "expected_roi": 150
+    }
+}
+
+MAP_HISTORY_BONUS = 8    # map is among the most hosted for this type in the last 30 days
+MAP_TRENDING_BONUS = 3
+SLOT_PRICING = {"Prime Time": (1.15, "Prime time pricing (+15%)"), "Standard": (0.95, "Off-peak discount (-5%)")}
+
+# tournament_type -> (IST hour, suggestion)
+_suggestion_cache = {}
+
+def score_candidate(candidate, historical, market):
+    """Rank a candidate by its confidence, map popularity and how well its size fits past turnout"""
+    score = candidate["confidence"]
+    if candidate["map"] in historical.get("popular_maps", []):
+        score += MAP_HISTORY_BONUS
+    if candidate["map"] in market.get("trending_maps", []):
+        score += MAP_TRENDING_BONUS
+    size_gap = abs(candidate["optimal_participants"] - historical.get("avg_participants", candidate["optimal_participants"]))
+    return score - min(10, size_gap)
+
+def build_ai_suggestion(tournament_type, historical, market, timing):
+    """Best candidate for the given analytics, adjusted for the upcoming slot and current activity"""
+    candidates = AI_CANDIDATES.get(tournament_type, AI_CANDIDATES["solo"])
+    suggestion = dict(max(candidates, key=lambda c: score_candidate(c, historical, market)))
+    
+    pricing = SLOT_PRICING.get(timing.get("slot_quality"))
+    if pricing:
+        factor, note = pricing
+        suggestion["entry_fee"] = int(suggestion["entry_fee"] * factor)
+        suggestion["reasoning"] += f" | {note}"
+    
+    if market.get("player_activity", 0) > 80:
+        suggestion["confidence"] = min(99, suggestion["confidence"] + 5)
+        suggestion["reasoning"] += " | High player activity detected"
+    
+    suggestion["suggested_time"] = timing.get("suggested_time")
+    suggestion["suggested_date"] = timing.get("suggested_date")
+    return suggestion
+
 def get_ai_tournament_suggestion(tournament_type):
-    """Get AI suggestion for tournament with advanced analysis"""
+    """AI suggestion dict for a tournament type; recomputed at most once per IST hour"""
+    hour_key = get_ist_time().strftime("%Y-%m-%d %H")
+    cached = _suggestion_cache.get(tournament_type)
+    if cached and cached[0] == hour_key:
+        return dict(cached[1])
+    
     try:
-        from datetime import datetime, timedelta
-        import random
-        from database import db, get_financial_data
-        
-        # Analyze historical data
-        historical_data = analyze_historical_performance(tournament_type)
-        market_trends = analyze_market_trends()
-        optimal_timing = get_optimal_tournament_timing()
-        
-        # AI-driven suggestions based on data
-        ai_suggestions = {
-            "solo": [
-                {
-                    "name": "SNIPER ELITE SHOWDOWN",
-                    "map": "Miramar",
-                    "entry_fee": 60,
-                    "prize_type": "kill_based",
-                    "confidence": 92,
-                    "reasoning": "Miramar shows 15% higher kill rates in historical data. Sniper meta trending +23%",
-                    "optimal_participants": 24,
-                    "expected_roi": 185
-                },
-                {
-                    "name": "CLOSE COMBAT CARNAGE",
-                    "map": "Livik", 
-                    "entry_fee": 45,
-                    "prize_type": "rank_based",
-                    "confidence": 88,
-                    "reasoning": "Livik generates fastest matches (avg 18min). Perfect for quick turnovers",
-                    "optimal_participants": 20,
-                    "expected_roi": 165
-                },
-                {
-                    "name": "SURVIVAL INSTINCT",
-                    "map": "Erangel",
-                    "entry_fee": 75,
-                    "prize_type": "hybrid",
-                    "confidence": 85,
-                    "reasoning": "Classic map with balanced engagement. Mixed prize pools show 12% better retention",
-                    "optimal_participants": 18,
-                    "expected_roi": 142
-                }
-            ],
-            "duo": [
-                {
-                    "name": "TACTICAL PARTNERS",
-                    "map": "Sanhok",
-                    "entry_fee": 90,
-                    "prize_type": "rank_based",
-                    "confidence": 94,
-                    "reasoning": "Sanhok duo meta is 28% more engaging. Team coordination peaks here",
-                    "optimal_participants": 16,
-                    "expected_roi": 198
-                },
-                {
-                    "name": "DESERT STORM DUOS",
-                    "map": "Miramar",
-                    "entry_fee": 85,
-                    "prize_type": "kill_based",
-                    "confidence": 87,
-                    "reasoning": "Long-range combat favors skilled duos. Higher skill = better retention",
-                    "optimal_participants": 14,
-                    "expected_roi": 172
-                },
-                {
-                    "name": "URBAN WARFARE",
-                    "map": "Karakin",
-                    "entry_fee": 95,
-                    "prize_type": "fixed",
-                    "confidence": 83,
-                    "reasoning": "High-intensity close combat. Fixed prizes reduce payout volatility",
-                    "optimal_participants": 12,
-                    "expected_roi": 156
-                }
-            ],
-            "squad": [
-                {
-                    "name": "SQUAD SUPREMACY",
-                    "map": "Erangel",
-                    "entry_fee": 220,
-                    "prize_type": "rank_based",
-                    "confidence": 96,
-                    "reasoning": "Erangel squad tournaments show highest completion rates (94%). Premium pricing justified",
-                    "optimal_participants": 12,
-                    "expected_roi": 215
-                },
-                {
-                    "name": "JUNGLE WARFARE",
-                    "map": "Sanhok",
-                    "entry_fee": 180,
-                    "prize_type": "kill_based",
-                    "confidence": 91,
-                    "reasoning": "Dense terrain increases engagement frequency. Kill-based rewards drive aggression",
-                    "optimal_participants": 10,
-                    "expected_roi": 189
-                },
-                {
-                    "name": "BATTLEGROUND LEGENDS",
-                    "map": "Miramar",
-                    "entry_fee": 250,
-                    "prize_type": "hybrid",
-                    "confidence": 88,
-                    "reasoning": "Premium positioning tournament. Mix of kills+ranks maximizes competitive balance",
-                    "optimal_participants": 8,
-                    "expected_roi": 167
-                }
-            ]
-        }
-        
-        # Select best suggestion based on current market conditions
-        suggestions = ai_suggestions.get(tournament_type, ai_suggestions["solo"])
-        
-        # Apply real-time adjustments
-        best_suggestion = suggestions[0]  # Highest confidence
-        
-        # Adjust based on current time and market conditions
-        current_hour = datetime.now().hour
-        if 18 <= current_hour <= 22:  # Prime time
-            best_suggestion["entry_fee"] = int(best_suggestion["entry_fee"] * 1.15)
-            best_suggestion["reasoning"] += " | Prime time pricing (+15%)"
-        elif 14 <= current_hour <= 17:  # Afternoon
-            best_suggestion["entry_fee"] = int(best_suggestion["entry_fee"] * 0.95)
-            best_suggestion["reasoning"] += " | Afternoon discount (-5%)"
-        
-        # Add market sentiment
-        if market_trends["player_activity"] > 80:
-            best_suggestion["confidence"] = min(99, best_suggestion["confidence"] + 5)
-            best_suggestion["reasoning"] += " | High player activity detected"
-        
-        return best_suggestion
-        
+        suggestion = build_ai_suggestion(
+            tournament_type,
+            analyze_historical_performance(tournament_type),
+            analyze_market_trends(),
+            get_optimal_tournament_timing()
+        )
     except Exception as e:
-        # Fallback to basic suggestion if AI analysis fails
-        basic_suggestions = {
-            "solo": {
-                "name": "SOLO SHOWDOWN",
-                "map": "Livik",
-                "entry_fee": 50,
-                "prize_type": "kill_based",
-                "confidence": 75,
-                "reasoning": "Standard solo tournament configuration",
-                "optimal_participants": 20,
-                "expected_roi": 150
-            },
-            "duo": {
-                "name": "DUO BATTLE",
-                "map": "Sanhok",
-                "entry_fee": 80,
-                "prize_type": "rank_based",
-                "confidence": 75,
-                "reasoning": "Standard duo tournament configuration",
-                "optimal_participants": 15,
-                "expected_roi": 150
-            },
-            "squad": {
-                "name": "SQUAD CLASH",
-                "map": "Erangel",
-                "entry_fee": 200,
-                "prize_type": "rank_based",
-                "confidence": 75,
-                "reasoning": "Standard squad tournament configuration",
-                "optimal_participants": 10,
-                "expected_roi": 150
-            }
-        }
-        return basic_suggestions.get(tournament_type, basic_suggestions["solo"])
+        print(f"AI suggestion failed: {e}")
+        return dict(FALLBACK_SUGGESTIONS.get(tournament_type, FALLBACK_SUGGESTIONS["solo"]))
+    
+    _suggestion_cache[tournament_type] = (hour_key, suggestion)
+    return dict(suggestion)
 
 def calculate_profit_loss(tournament_type, participants_count, entry_fee):
     """Calculate profit/loss for tournament"""
@@ -251,6 +283,23 @@ def get_tournament_status_emoji(status):
     }
     return status_emojis.get(status, "🟡")
 
+def chunk_lines(lines, header="", limit=TELEGRAM_MESSAGE_LIMIT):
+    """Pack lines into as few messages as possible, each under the Telegram size limit"""
+    chunks = []
+    current = header
+
+    for line in lines:
+        line = line[:limit - 1]
+        if current and len(current) + len(line) + 1 > limit:
+            chunks.append(current)
+            current = ""
+        current += line + "\n"
+
+    if current:
+        chunks.append(current)
+
+    return chunks
+
 def extract_username_from_message(text):
     """Extract username from admin command"""
     words = text.split()
@@ -293,7 +342,7 @@ def analyze_historical_performance(tournament_type):
         historical_tournaments = list(db.tournaments.find({
             "type": tournament_type,
             "created_at": {"$gte": thirty_days_ago}
-        }))
+        }, {"_id": 0, "map": 1, "participant_count": 1}))
         
         if not historical_tournaments:
             return {
@@ -305,7 +354,7 @@ def analyze_historical_performance(tournament_type):
             }
         
         # Calculate metrics
-        total_participants = sum(len(t.get('participants', [])) for t in historical_tournaments)
+        total_participants = sum(t.get('participant_count', 0) for t in historical_tournaments)
         avg_participants = total_participants / len(historical_tournaments) if historical_tournaments else 15
         
         # Map popularity
@@ -341,18 +390,14 @@ def analyze_market_trends():
         from datetime import datetime, timedelta
         import random
         
-        # Simulate market analysis (in real implementation, this would connect to analytics)
-        current_hour = datetime.now().hour
-        
-        # Base activity on time of day
-        if 18 <= current_hour <= 22:
-            base_activity = random.randint(85, 95)
-        elif 14 <= current_hour <= 17:
-            base_activity = random.randint(70, 80)
-        elif 22 <= current_hour <= 24 or 0 <= current_hour <= 2:
-            base_activity = random.randint(60, 75)
+        # Activity this hour of the week relative to the busiest hour
+        scores = get_activity_scores()
+        if scores:
+            current_time = get_ist_time()
+            current_score = scores[current_time.weekday() * 24 + current_time.hour]
+            base_activity = round(100 * current_score / max(scores))
         else:
-            base_activity = random.randint(40, 60)
+            base_activity = 75
         
         # Get recent user activity
         recent_users = db.users.count_documents({
@@ -379,10 +424,77 @@ def analyze_market_trends():
             "competition_level": "Medium"
         }
 
+# Hour-of-week activity scores are cached per clock hour
+_timing_cache = {}
+JOIN_WEIGHT = 3          # a join says more about turnout than just being online
+MIN_ACTIVITY_SAMPLES = 50
+
+def get_activity_scores():
+    """Hour-of-week activity scores (168 values, Monday 00:00 IST first), or None if too little data"""
+    from database import get_activity_histogram
+    hour_key = get_ist_time().strftime("%Y-%m-%d %H")
+    cached = _timing_cache.get("scores")
+    if cached and cached[0] == hour_key:
+        return cached[1]
+    
+    histogram = get_activity_histogram()
+    scores = [bucket["users"] + JOIN_WEIGHT * bucket["joins"] for bucket in histogram]
+    if sum(scores) < MIN_ACTIVITY_SAMPLES:
+        scores = None
+    
+    _timing_cache["scores"] = (hour_key, scores)
+    return scores
+
 def get_optimal_tournament_timing():
-    """Get optimal tournament timing based on analysis"""
+    """Get optimal tournament timing from the hour-of-week activity histogram"""
     from datetime import timedelta
     current_time = get_ist_time()
+    hour_key = current_time.strftime("%Y-%m-%d %H")
+    
+    cached = _timing_cache.get("timing")
+    if cached and cached[0] == hour_key:
+        return cached[1]
+    
+    try:
+        scores = get_activity_scores()
+    except Exception as e:
+        print(f"Activity histogram unavailable: {e}")
+        scores = None
+    
+    if scores is None:
+        timing = _default_tournament_timing(current_time)
+    else:
+        ranked = sorted(scores)
+        now_slot = current_time.weekday() * 24 + current_time.hour
+        
+        # Best slot in the next 24 hours
+        hour_offset = max(range(1, 25), key=lambda offset: (scores[(now_slot + offset) % 168], -offset))
+        score = scores[(now_slot + hour_offset) % 168]
+        percentile = sum(1 for s in ranked if s <= score) / len(ranked)
+        
+        if percentile >= 0.8:
+            slot_quality, expected_participation = "Prime Time", "High"
+        elif percentile >= 0.5:
+            slot_quality, expected_participation = "Good", "Medium-High"
+        else:
+            slot_quality, expected_participation = "Standard", "Medium"
+        
+        target_time = (current_time + timedelta(hours=hour_offset)).replace(minute=0)
+        timing = {
+            "suggested_time": target_time.strftime("%H:%M"),
+            "suggested_date": target_time.strftime("%Y-%m-%d"),
+            "slot_quality": slot_quality,
+            "expected_participation": expected_participation,
+            "hours_from_now": hour_offset,
+            "activity_score": score
+        }
+    
+    _timing_cache["timing"] = (hour_key, timing)
+    return timing
+
+def _default_tournament_timing(current_time):
+    """Fixed evening slots, used until enough activity has been recorded"""
+    from datetime import timedelta
     current_hour = current_time.hour
     
     # Define optimal time slots
@@ -520,37 +632,3 @@ def get_next_tournament_time():
         "quality": optimal_timing["slot_quality"],
         "expected_participation": optimal_timing["expected_participation"]
     }
-
-def get_ai_tournament_suggestion(mode: str) -> str:
-    if mode == "solo":
-        return (
-            "🎯 *AI Suggested Solo Tournament:*\n"
-            "• Entry Fee: ₹20\n"
-            "• Prize Pool: ₹500\n"
-            "• Top 10 Players Win\n"
-            "• Map: Erangel\n"
-            "• Mode: TPP"
-        )
-    elif mode == "duo":
-        return (
-            "👬 *AI Suggested Duo Tournament:*\n"
-            "• Entry Fee: ₹40/team\n"
-            "• Prize Pool: ₹1000\n"
-            "• Top 5 Teams Win\n"
-            "• Map: Livik\n"
-            "• Mode: FPP"
-        )
-    elif mode == "squad":
-        return (
-            "👑 *AI Suggested Squad Tournament:*\n"
-            "• Entry Fee: ₹100/team\n"
-            "• Prize Pool: ₹5000\n"
-            "• Top 3 Squads Win\n"
-            "• Map: Miramar\n"
-            "• Mode: TPP/FPP"
-        )
-    else:
-        return "❌ Invalid type! Use `/aihost solo`, `/aihost duo`, or `/aihost squad`"
-
-
-
@@ -0,0 +1,53 @@
+"""
+Waitlist promotion notifications for No Mercy Zone Bot
+"""
+
+import asyncio
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from config import WAITLIST_OFFER_MINUTES
+from database import promote_waitlist, expire_waitlist_offers, load_tournament
+from channel_posts import mark_post_dirty
+
+# Stay well under Telegram's ~30 messages/second broadcast limit
+NOTIFY_DELAY = 0.05
+
+
+async def notify_promoted(bot, tournament_id, user_ids):
+    """Tell promoted users a slot is held for them"""
+    if not user_ids:
+        return
+
+    tournament = await asyncio.to_thread(load_tournament, tournament_id, ["tournament_id", "name"])
+    if not tournament:
+        return
+
+    msg = f"""🎉 SLOT KHALI HUA!
+
+🎮 Tournament: {tournament['name']}
+⏰ Aapke liye slot {WAITLIST_OFFER_MINUTES} minute ke liye hold hai.
+
+Payment/free entry ke saath abhi join karo, warna slot agle player ko chala jayega! 🔥"""
+    keyboard = [[InlineKeyboardButton("✅ Claim Slot", callback_data=f"join_tournament_{tournament_id}")]]
+
+    for user_id in user_ids:
+        try:
+            await bot.send_message(chat_id=user_id, text=msg, reply_markup=InlineKeyboardMarkup(keyboard))
+        except Exception as e:
+            print(f"Failed to notify promoted user {user_id}: {e}")
+        await asyncio.sleep(NOTIFY_DELAY)
+
+
+async def release_slots(bot, tournament_id):
+    """Offer freed slots to the waitlist and notify whoever was promoted"""
+    promoted = await asyncio.to_thread(promote_waitlist, tournament_id)
+    mark_post_dirty(tournament_id)
+    await notify_promoted(bot, tournament_id, promoted)
+    return promoted
+
+
+async def sweep_waitlist_offers(bot):
+    """Background job: expire lapsed offers and pass the slots on"""
+    promotions = await asyncio.to_thread(expire_waitlist_offers)
+    for tournament_id, user_ids in promotions.items():
+        mark_post_dirty(tournament_id)
+        await notify_promoted(bot, tournament_id, user_ids)